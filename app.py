@@ -1,13 +1,217 @@
 import streamlit as st
 import main
 import os
-import markdownify
-import base64
+import hashlib
+import time
+import uuid
+import weakref
 from io import BytesIO
-from PIL import Image
 
 st.set_page_config(page_title="Content Generator", page_icon="📝", layout="wide")
 
+# --- Memoized rendering ---
+# Reruns happen on every interaction; these keep the expensive parts keyed on content hashes.
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_body_preview(body_digest, _body):
+    if '<table' in _body:
+        import markdownify  # only needed for bodies with HTML tables
+        return markdownify.markdownify(_body, heading_style="ATX")
+    return _body
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def preview_thumbnail(image_digest, _load_image, max_size=(320, 320)):
+    image = _load_image()
+    if image is None:
+        return None
+    buffer = BytesIO()
+    image.thumbnail(max_size).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# --- Near-duplicate checks ---
+def similar_content(check, text):
+    """Matches from the near-duplicate index ("check_topic" or "check_draft"); [] if it cannot be built."""
+    try:
+        index = main.get_duplicate_index()
+        if index.synced_at is None:
+            st.caption("Duplicate check skipped: the WordPress mirror was never synced (`python wp_mirror.py sync`).")
+        return getattr(index, check)(text)
+    except Exception as e:
+        st.caption(f"Duplicate check unavailable: {e}")
+        return []
+
+def describe_matches(matches):
+    return "\n".join(f"- {m['title']} ({m['route']} #{m['id']}, {m['similarity']:.0%} similar)" for m in matches[:5])
+
+# --- Session artifacts ---
+# Generated images live in the shared artifact spool; session state only keeps small handles.
+class _ArtifactSession:
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+def artifact_session_id():
+    if '_artifact_session' not in st.session_state:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        session = _ArtifactSession(ctx.session_id if ctx else uuid.uuid4().hex)
+        # Session state is dropped when the browser session ends; release its artifacts with it.
+        weakref.finalize(session, main.get_artifact_store().release_session, session.session_id)
+        st.session_state['_artifact_session'] = session
+    return st.session_state['_artifact_session'].session_id
+
+def stash_image(key, image):
+    store = main.get_artifact_store()
+    session_id = artifact_session_id()
+    handle = store.put(session_id, image.data)
+    previous = st.session_state.get(key)
+    if previous is not None and previous != handle:
+        store.release(session_id, previous)
+    st.session_state[key] = handle
+
+def load_image(key):
+    """The ImageAsset behind a session handle, or None if it was evicted."""
+    return main.get_artifact_store().load_image(artifact_session_id(), st.session_state.get(key))
+
+def image_expired(key):
+    """True if the session holds a handle whose image the store has evicted since."""
+    handle = st.session_state.get(key)
+    return handle is not None and not main.get_artifact_store().contains(artifact_session_id(), handle)
+
+def show_image_preview(key):
+    # The thumbnail is cached by digest and outlives the spooled image, so check the handle first;
+    # an expired picture keeps its warning until it is regenerated or discarded.
+    thumbnail = None if image_expired(key) else preview_thumbnail(st.session_state[key].digest, lambda: load_image(key))
+    if thumbnail:
+        st.image(thumbnail)
+    else:
+        st.warning("This picture expired; generate it again.")
+        if st.button("Discard", key=f'discard_{key}'):
+            del st.session_state[key]
+            st.rerun()
+
+# --- Background jobs ---
+# Generation and uploads run on the process-wide JobManager so they overlap and survive reruns.
+# The session keeps only job ids per slot, mirrored into the URL so a reloaded page finds them again.
+JOB_SLOTS = ('content', 'image_1', 'image_2', 'upload')
+
+def job_ids():
+    if 'jobs' not in st.session_state:
+        saved = st.query_params.get('jobs', '')
+        st.session_state['jobs'] = dict(item.split(':', 1) for item in saved.split(',') if ':' in item)
+        st.session_state['job_errors'] = {}
+        st.session_state['run_traces'] = {}
+    return st.session_state['jobs']
+
+def save_job_ids():
+    ids = job_ids()
+    if ids:
+        st.query_params['jobs'] = ','.join(f"{slot}:{job_id}" for slot, job_id in ids.items())
+    elif 'jobs' in st.query_params:
+        del st.query_params['jobs']
+
+def start_job(slot, fn, *args, label="", **kwargs):
+    job = main.get_job_manager().submit(slot, fn, *args, owner=artifact_session_id(), label=label, **kwargs)
+    job_ids()[slot] = job.id
+    st.session_state['job_errors'].pop(slot, None)
+    save_job_ids()
+
+def current_job(slot):
+    job_id = job_ids().get(slot)
+    if not job_id:
+        return None
+    job = main.get_job_manager().get(job_id)
+    if job is None:  # expired, or started before a restart
+        del job_ids()[slot]
+        save_job_ids()
+    return job
+
+def job_running(slot):
+    job = current_job(slot)
+    return job is not None and not job.done
+
+def take_finished_job(slot):
+    """Return the slot's job once it has finished, forgetting it so its result is applied only once."""
+    job = current_job(slot)
+    if job is None or not job.done:
+        return None
+    del job_ids()[slot]
+    save_job_ids()
+    main.get_job_manager().discard(job.id)
+    if job.trace_id:
+        st.session_state['run_traces'][slot] = job.trace_id
+    if job.error:
+        st.session_state['job_errors'][slot] = job.error
+    return job
+
+def show_job_status(slot, text):
+    job = current_job(slot)
+    if job is not None and not job.done:
+        st.info(f"⏳ {text} ({job.elapsed:.0f}s)" + (f" – {job.message}" if job.message else ""))
+    error = st.session_state['job_errors'].get(slot)
+    if error:
+        st.error(error)
+
+def content_job(job, topic, content_type, keywords, use_cache):
+    title, body = "", ""
+    for title, body, done in main.generate_content_stream(topic, content_type, keywords, use_cache=use_cache):
+        if not done:
+            job.update(partial=(title, body), message=f"{len(body.split())} words so far")
+    if not title or not body or title.startswith("Error"):
+        raise Exception("Failed to generate content. Please try again.")
+    return title, body
+
+def candidates_job(job, topic, content_type, keywords, count, use_cache):
+    ranked = main.generate_candidates(topic, content_type, keywords, n=count, use_cache=use_cache)
+    if not ranked or not ranked[0]['scores']['total']:
+        raise Exception("Failed to generate content. Please try again.")
+    return ranked
+
+def use_candidate(candidate):
+    st.session_state['case_study_title'] = candidate['title']
+    st.session_state['case_study_body'] = candidate['body']
+    st.session_state['upload_completed'] = False
+    st.session_state['uploaded_post_url'] = ''
+
+def apply_edit(field):
+    """on_change of the title/body editors: commit the edit and invalidate an earlier upload."""
+    value = st.session_state[f'{field}_input']
+    if value != st.session_state[field]:
+        st.session_state[field] = value
+        st.session_state['upload_completed'] = False
+        st.session_state['uploaded_post_url'] = ''
+
+def describe_scores(scores):
+    return " · ".join(f"{name} {value:.0%}" for name, value in scores.items() if name != 'total')
+
+def image_job(job, prompt):
+    image = main.generate_image(prompt)
+    if not image:
+        raise Exception("Failed to generate image")
+    return image
+
+def upload_job(job, title, body, images, content_type):
+    return main.upload_to_wordpress(title, body, images, content_type, template=None, page_template=None,
+                                    categories=None, meta=None)
+
+def collect_jobs():
+    """Apply the results of jobs that finished since the last rerun."""
+    job = take_finished_job('content')
+    if job and job.result:
+        # candidates_job returns ranked drafts (best first), content_job a (title, body) pair.
+        ranked = job.result if isinstance(job.result, list) else [{'title': job.result[0], 'body': job.result[1]}]
+        st.session_state['candidates'] = ranked if len(ranked) > 1 else []
+        use_candidate(ranked[0])
+    for slot in ('image_1', 'image_2'):
+        job = take_finished_job(slot)
+        if job and job.result:
+            stash_image(f'generated_image_{slot[-1]}', job.result)
+    job = take_finished_job('upload')
+    if job and job.result:
+        st.session_state['upload_completed'] = True
+        st.session_state['uploaded_post_url'] = job.result[1]
+
 st.markdown("""
     <style>
     .centered {
@@ -32,6 +236,11 @@ for key in ['company_name', 'case_study_title', 'case_study_body', 'upload_compl
             st.session_state[key] = False
         else:
             st.session_state[key] = ''
+if 'candidates' not in st.session_state:
+    st.session_state['candidates'] = []
+
+job_ids()
+collect_jobs()
 
 with st.container():
     st.subheader("Enter Content Details")
@@ -45,19 +254,30 @@ with st.container():
 
     with col3:
         content_type = st.selectbox("Content Type", ["Case Study", "Blog"], key='content_type')
+        bypass_cache = st.checkbox("Regenerate (skip cache)", key='bypass_cache', help="Ignore previously generated content for the same prompt")
+        candidate_count = st.number_input("Drafts", min_value=1, max_value=4, value=1, key='candidate_count',
+                                          help="Ask for several drafts in one request (the prompt is paid once) and rank them")
 
-    if st.button(f"Generate {content_type}", type="primary"):
-        if topic:
-            with st.spinner(f"Generating {content_type.lower()}..."):
-                title, body = main.generate_content(topic, content_type, keywords)
-                if title and body and not title.startswith("Error"):
-                    st.session_state['case_study_title'] = title
-                    st.session_state['case_study_body'] = body
-                    st.session_state['upload_completed'] = False
-                    st.session_state['uploaded_post_url'] = ''
-                    st.rerun()
-                else:
-                    st.error("Failed to generate content. Please try again.")
+    # Pre-screen the topic against existing titles before spending an LLM call on it.
+    topic_matches = similar_content("check_topic", topic) if topic else []
+    generate_anyway = False
+    if topic_matches:
+        st.warning("Similar content already exists on the site:\n\n" + describe_matches(topic_matches))
+        generate_anyway = st.checkbox("Generate anyway", key='generate_anyway')
+
+    if st.button(f"Generate {content_type}", type="primary",
+                 disabled=job_running('content') or (bool(topic_matches) and not generate_anyway)):
+        if topic and not job_running('content'):
+            if candidate_count > 1:
+                start_job('content', candidates_job, topic, content_type, keywords, candidate_count, not bypass_cache, label=topic)
+            else:
+                start_job('content', content_job, topic, content_type, keywords, not bypass_cache, label=topic)
+
+    show_job_status('content', f"Generating {content_type.lower()}...")
+    content = current_job('content')
+    if content is not None and content.partial:
+        title, body = content.partial
+        st.markdown(f"### {title}\n\n{body}" if title else body)
 
     # Image generation
     st.subheader("Generate Custom Images")
@@ -66,52 +286,32 @@ with st.container():
     with img_prompt_col1:
         image_prompt_1 = st.text_input("Display Picture Generation Prompt", placeholder="Example: A modern manufacturing facility with CNC machines...", key='image_prompt_1')
     with img_prompt_col2:
-        if st.button("Generate Display Picture", key="generate_image_btn_1"):
-            if image_prompt_1:
-                with st.spinner("Generating display picture..."):
-                    try:
-                        image_data = main.generate_image(image_prompt_1)
-                        if image_data:
-                            st.session_state['generated_image_1'] = image_data
-                            st.success("Display picture generated successfully!")
-                        else:
-                            st.error("Failed to generate image")
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
+        if st.button("Generate Display Picture", key="generate_image_btn_1", disabled=job_running('image_1')):
+            if image_prompt_1 and not job_running('image_1'):
+                start_job('image_1', image_job, image_prompt_1, label=image_prompt_1)
+    show_job_status('image_1', "Generating display picture...")
 
     if 'generated_image_1' in st.session_state:
         col1, col2 = st.columns([1, 5])
         with col1:
-            image_bytes = base64.b64decode(st.session_state['generated_image_1'])
-            image = Image.open(BytesIO(image_bytes))
             with st.expander("Display Picture Preview", expanded=True):
-                st.image(image)
+                show_image_preview('generated_image_1')
 
     st.markdown("#### Content Picture")
     img_prompt_col3, img_prompt_col4 = st.columns([3, 1])
     with img_prompt_col3:
         image_prompt_2 = st.text_input("Content Picture Generation Prompt", placeholder="Example: Close-up view of a smart manufacturing process...", key='image_prompt_2')
     with img_prompt_col4:
-        if st.button("Generate Content Picture", key="generate_image_btn_2"):
-            if image_prompt_2:
-                with st.spinner("Generating content picture..."):
-                    try:
-                        image_data = main.generate_image(image_prompt_2)
-                        if image_data:
-                            st.session_state['generated_image_2'] = image_data
-                            st.success("Content picture generated successfully!")
-                        else:
-                            st.error("Failed to generate image")
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
+        if st.button("Generate Content Picture", key="generate_image_btn_2", disabled=job_running('image_2')):
+            if image_prompt_2 and not job_running('image_2'):
+                start_job('image_2', image_job, image_prompt_2, label=image_prompt_2)
+    show_job_status('image_2', "Generating content picture...")
 
     if 'generated_image_2' in st.session_state:
         col1, col2 = st.columns([1, 5])
         with col1:
-            image_bytes = base64.b64decode(st.session_state['generated_image_2'])
-            image = Image.open(BytesIO(image_bytes))
             with st.expander("Content Picture Preview", expanded=True):
-                st.image(image)
+                show_image_preview('generated_image_2')
 
     st.subheader("Or Upload Images")
     img_col1, img_col2 = st.columns(2)
@@ -126,37 +326,46 @@ with st.container():
 
     if st.session_state['case_study_title'] or st.session_state['case_study_body']:
         st.subheader("Generated Content")
+        draft_matches = similar_content("check_draft", st.session_state['case_study_body'])
+        if draft_matches:
+            st.warning("This draft is nearly identical to published content:\n\n" + describe_matches(draft_matches))
 
+        # Drafts from one multi-candidate request, best score first; picking one replaces the content below.
+        if st.session_state['candidates']:
+            with st.expander(f"Drafts ({len(st.session_state['candidates'])})", expanded=True):
+                for i, (column, candidate) in enumerate(zip(st.columns(len(st.session_state['candidates'])), st.session_state['candidates'])):
+                    with column:
+                        selected = candidate['body'] == st.session_state['case_study_body']
+                        st.markdown(f"**{i + 1}. {candidate['title']}**")
+                        st.caption(f"Score {candidate['scores']['total']:.0%} – {describe_scores(candidate['scores'])}")
+                        with st.container(height=300):
+                            st.markdown(render_body_preview(text_digest(candidate['body']), candidate['body']), unsafe_allow_html=True)
+                        if st.button("In use" if selected else "Use this draft", key=f'use_draft_{i}', disabled=selected):
+                            use_candidate(candidate)
+                            st.rerun()
+
+        # Edits are committed when a field loses focus (text inputs never rerun per keystroke), and
+        # the callbacks run before any button in the same rerun, so Upload always sends the edited text.
         title_col1, title_col2 = st.columns([1, 1])
         with title_col1:
             st.markdown("### Title")
             st.markdown(f"**{st.session_state['case_study_title']}**")
         with title_col2:
             st.markdown("### Edit Title")
-            edited_title = st.text_input("Edit the title below", value=st.session_state['case_study_title'], key='case_study_title_input')
-            if edited_title != st.session_state['case_study_title']:
-                st.session_state['case_study_title'] = edited_title
-                st.session_state['upload_completed'] = False
-                st.session_state['uploaded_post_url'] = ''
-                st.rerun()
+            st.text_input("Edit the title below", value=st.session_state['case_study_title'], key='case_study_title_input',
+                          on_change=apply_edit, args=('case_study_title',))
 
         preview_col, edit_col = st.columns([1, 1])
         with preview_col:
             st.markdown("#### Preview")
             st.markdown("""<style>table {width: 100%; border-collapse: collapse;}</style>""", unsafe_allow_html=True)
             body_content = st.session_state['case_study_body']
-            if '<table' in body_content:
-                body_content = markdownify.markdownify(body_content, heading_style="ATX")
-            st.markdown(body_content, unsafe_allow_html=True)
+            st.markdown(render_body_preview(text_digest(body_content), body_content), unsafe_allow_html=True)
 
         with edit_col:
             st.markdown("#### Edit Content")
-            edited_body = st.text_area("Edit the content below", value=st.session_state['case_study_body'], height=400, key='case_study_body_input')
-            if edited_body != st.session_state['case_study_body']:
-                st.session_state['case_study_body'] = edited_body
-                st.session_state['upload_completed'] = False
-                st.session_state['uploaded_post_url'] = ''
-                st.rerun()
+            st.text_area("Edit the content below", value=st.session_state['case_study_body'], height=400, key='case_study_body_input',
+                         on_change=apply_edit, args=('case_study_body',))
 
         st.subheader("Upload to WordPress")
         if st.session_state['upload_completed']:
@@ -167,32 +376,34 @@ with st.container():
                     unsafe_allow_html=True
                 )
         else:
-            if st.button("Upload Content", type="primary"):
-                with st.spinner("Uploading content to WordPress..."):
-                    try:
-                        images = []
-                        if 'generated_image_1' in st.session_state:
-                            images.append(st.session_state['generated_image_1'])
-                        if 'generated_image_2' in st.session_state:
-                            images.append(st.session_state['generated_image_2'])
-
-                        post_id, post_url = main.upload_to_wordpress(
-                            st.session_state['case_study_title'],
-                            st.session_state['case_study_body'],
-                            images,
-                            st.session_state.get('content_type', 'Case Study'),
-                            template=None,
-                            page_template=None,
-                            categories=None,
-                            meta=None
-                        )
-                        st.session_state['upload_completed'] = True
-                        st.session_state['uploaded_post_url'] = post_url  # <--- Store the post URL for display
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error uploading content: {str(e)}")
+            if st.button("Upload Content", type="primary", disabled=job_running('upload')):
+                keys = [key for key in ('generated_image_1', 'generated_image_2') if key in st.session_state]
+                images = [load_image(key) for key in keys]
+                if any(image is None for image in images):
+                    # Never publish a post silently missing a picture the user saw in the preview.
+                    st.error("A generated picture expired before upload; generate it again or discard it, then upload.")
+                else:
+                    start_job('upload', upload_job, st.session_state['case_study_title'], st.session_state['case_study_body'],
+                              images, st.session_state.get('content_type', 'Case Study'))
+            show_job_status('upload', "Uploading content to WordPress...")
     else:
         if topic:
             st.info(f"Click 'Generate {content_type}' to create the content.")
 
 st.markdown("---")
+
+# Per-run stage timings (prompt build, first token, LLM, image generation, encode, uploads).
+if st.session_state['run_traces']:
+    import tracing
+    with st.expander("Run timings"):
+        for slot, trace_id in st.session_state['run_traces'].items():
+            rows = tracing.get_tracer().breakdown(trace_id)
+            if rows:
+                lines = [f"**{slot.replace('_', ' ').capitalize()}**", "", "| Stage | ms | Details |", "| --- | ---: | --- |"]
+                lines += [f"| {'&nbsp;' * 2 * (len(r['stage']) - len(r['stage'].lstrip()))}{r['stage'].strip()} | {r['ms']} | {r['details']} |" for r in rows]
+                st.markdown("\n".join(lines), unsafe_allow_html=True)
+
+# Poll while this session has jobs in flight; every rerun applies whatever finished meanwhile.
+if any(job_running(slot) for slot in JOB_SLOTS):
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+__all__ = ['ArtifactStore', 'ArtifactHandle']
+
+
+def _is_hex(text):
+    return all(c in "0123456789abcdef" for c in text)
+
+
+class ArtifactHandle:
+    """A small, picklable reference to bytes spooled in an ArtifactStore."""
+
+    __slots__ = ("digest", "size", "kind")
+
+    def __init__(self, digest, size, kind="image"):
+        self.digest = digest
+        self.size = size
+        self.kind = kind
+
+    def __eq__(self, other):
+        return isinstance(other, ArtifactHandle) and (self.digest, self.kind) == (other.digest, other.kind)
+
+    def __hash__(self):
+        return hash((self.digest, self.kind))
+
+    def __getstate__(self):
+        return (self.digest, self.size, self.kind)
+
+    def __setstate__(self, state):
+        self.digest, self.size, self.kind = state
+
+    def __repr__(self):
+        return f"ArtifactHandle({self.kind!r}, {self.digest[:12]}, {self.size} bytes)"
+
+
+class ArtifactStore:
+    """Content-addressed spool directory for generated images and drafts, shared by all sessions.
+
+    Each session references the artifacts it created; a session over max_session_bytes, or the
+    store over max_total_bytes, drops its least recently used references. A file is deleted once
+    no session references it.
+    """
+
+    def __init__(self, root, max_session_bytes=32 * 1024 * 1024, max_total_bytes=256 * 1024 * 1024,
+                 max_idle=6 * 3600):
+        self.root = root
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._sessions = {}            # session_id -> OrderedDict(digest -> size), oldest first
+        self._last_seen = {}           # session_id -> time of last put/get
+        self._lru = OrderedDict()      # (session_id, digest) -> size, across every session
+        self._refs = {}                # digest -> number of sessions referencing it
+        self._total_bytes = 0          # bytes on disk
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._sweep_stale()
+
+    def _sweep_stale(self):
+        """Delete spool files a previous store left behind once they are older than max_idle.
+
+        Only the store's own layout (<2 hex chars>/<sha256>, plus its temp files) is touched, so
+        pointing root at an existing directory is safe, and a store rebuilt in a running process
+        (or another process sharing root) keeps recent files.
+        """
+        cutoff = time.time() - self.max_idle
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not _is_hex(prefix) or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                ours = (len(name) == 64 and name.startswith(prefix) and _is_hex(name)) or name.startswith("tmp")
+                try:
+                    if ours and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.rmdir(directory)  # only succeeds once it is empty
+            except OSError:
+                pass
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    # --- Writing ---
+    def put(self, session_id, data, kind="image"):
+        """Spool bytes for a session and return a handle to keep in session state."""
+        data = bytes(data)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            self._expire_idle()
+            if digest not in self._refs:
+                self._write(path, data)
+                self._refs[digest] = 0
+                self._total_bytes += len(data)
+            session = self._sessions.setdefault(session_id, OrderedDict())
+            if digest not in session:
+                self._refs[digest] += 1
+            session[digest] = len(data)
+            session.move_to_end(digest)
+            self._lru[(session_id, digest)] = len(data)
+            self._lru.move_to_end((session_id, digest))
+            self._last_seen[session_id] = time.time()
+            self._enforce_budgets(session_id, keep=digest)
+        return ArtifactHandle(digest, len(data), kind)
+
+    def put_text(self, session_id, text, kind="draft"):
+        return self.put(session_id, text.encode("utf-8"), kind)
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # --- Reading ---
+    def get(self, session_id, handle):
+        """Return the bytes for a handle, or None if the artifact was evicted."""
+        if handle is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or handle.digest not in session:
+                return None
+            session.move_to_end(handle.digest)
+            self._lru.move_to_end((session_id, handle.digest))
+            self._last_seen[session_id] = time.time()
+            path = self._path(handle.digest)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def contains(self, session_id, handle):
+        """Whether a handle still refers to a spooled artifact, without touching its recency."""
+        with self._lock:
+            return handle is not None and handle.digest in self._sessions.get(session_id, ())
+
+    def get_text(self, session_id, handle):
+        data = self.get(session_id, handle)
+        return data.decode("utf-8") if data is not None else None
+
+    def load_image(self, session_id, handle):
+        """Return an ImageAsset for an image handle, or None if it was evicted."""
+        from image_asset import ImageAsset
+
+        data = self.get(session_id, handle)
+        return ImageAsset(data) if data is not None else None
+
+    # --- Eviction ---
+    def _drop(self, session_id, digest):
+        size = self._sessions[session_id].pop(digest)
+        self._lru.pop((session_id, digest), None)
+        self._refs[digest] -= 1
+        if self._refs[digest] == 0:
+            del self._refs[digest]
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def _enforce_budgets(self, session_id, keep):
+        session = self._sessions[session_id]
+        for digest in list(session):
+            if sum(session.values()) <= self.max_session_bytes:
+                break
+            if digest != keep:
+                self._drop(session_id, digest)
+                self.evictions += 1
+        for owner, digest in list(self._lru):
+            if self._total_bytes <= self.max_total_bytes:
+                break
+            if (owner, digest) != (session_id, keep):
+                self._drop(owner, digest)
+                self.evictions += 1
+
+    def release(self, session_id, handle):
+        """Drop one artifact from a session, e.g. when it is replaced."""
+        with self._lock:
+            if handle is not None and handle.digest in self._sessions.get(session_id, ()):
+                self._drop(session_id, handle.digest)
+
+    def release_session(self, session_id):
+        """Drop everything a session references; called when the session ends."""
+        with self._lock:
+            self._release_session(session_id)
+
+    def _release_session(self, session_id):
+        for digest in list(self._sessions.get(session_id, ())):
+            self._drop(session_id, digest)
+        self._sessions.pop(session_id, None)
+        self._last_seen.pop(session_id, None)
+
+    def _expire_idle(self):
+        # Fallback for sessions whose end was never observed.
+        if self.max_idle is None:
+            return
+        cutoff = time.time() - self.max_idle
+        for session_id, seen in list(self._last_seen.items()):
+            if seen < cutoff:
+                self._release_session(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "artifacts": len(self._refs),
+                "total_bytes": self._total_bytes,
+                "evictions": self.evictions,
+            }
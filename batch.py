@@ -0,0 +1,238 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import main
+from run_journal import DUPLICATE, FAILED, GENERATED, IMAGE, PUBLISHED, RunJournal, topic_key
+
+IMAGE_ROLES = ("featured", "content")
+RESULT_FIELDS = [
+    "index", "topic", "content_type", "keywords", "featured_image_prompt", "content_image_prompt", "status",
+    "title", "body", "featured_media_id", "content_media_id", "post_id", "post_url", "duplicate_of",
+    "resumed", "error", "elapsed_s",
+]
+
+
+# --- Input ---
+def read_topics(path):
+    """Read topic rows (topic, content_type, keywords and optional featured/content image prompts)
+    from a CSV or JSONL file."""
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for record in records:
+            topic = (record.get("topic") or "").strip()
+            if not topic:
+                continue
+            rows.append({
+                "topic": topic,
+                "content_type": (record.get("content_type") or "Case Study").strip(),
+                "keywords": (record.get("keywords") or "").strip(),
+                **{f"{role}_image_prompt": (record.get(f"{role}_image_prompt") or "").strip() for role in IMAGE_ROLES},
+            })
+    return rows
+
+
+# --- Output ---
+class ResultWriter:
+    """Append one result row per topic to a CSV or JSONL file as soon as it is ready."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith((".jsonl", ".ndjson"))
+        self._lock = threading.Lock()
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._csv.writeheader()
+            self._file.flush()
+
+    def write(self, result):
+        with self._lock:
+            if self.jsonl:
+                self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            else:
+                self._csv.writerow(result)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Worker ---
+def _describe_matches(matches):
+    return "; ".join(f"{m['route']}/{m['id']} {m['title']} ({m['similarity']:.2f})" for m in matches[:3])
+
+
+def _generate_images(row, state, journal, key, skipped):
+    """The row's images by role, generating only those not already saved in the journal."""
+    images = {}
+    for role in IMAGE_ROLES:
+        prompt = row.get(f"{role}_image_prompt")
+        if not prompt:
+            continue
+        stage = f"{IMAGE}:{role}"
+        saved = state.get(stage)
+        image = journal.load_image(saved["digest"]) if saved and journal else None
+        if image is not None:
+            skipped.append(stage)
+        else:
+            image = main.generate_image(prompt)
+            if image is None:
+                raise Exception(f"Failed to generate {role} image")
+            if journal:
+                journal.record(key, stage, digest=journal.save_image(image), prompt=prompt)
+        images[role] = image
+    return images
+
+
+def process_topic(index, row, upload=True, use_cache=True, dedupe=True, journal=None):
+    """Generate (and optionally publish) a single topic and return its result row.
+
+    With dedupe, topics close to an existing title are skipped before the LLM call, and drafts
+    that nearly duplicate a published body are not uploaded. With a journal, every finished
+    stage is recorded and stages already recorded for this row are skipped, so a rerun after a
+    crash only pays for the work that was not done.
+    """
+    started = time.monotonic()
+    result = {field: "" for field in RESULT_FIELDS}
+    result.update(index=index, **row)
+    key = topic_key(row)
+    state = journal.state(key) if journal else {}
+    skipped = []
+    stage = GENERATED
+    try:
+        if PUBLISHED in state:
+            generated, published = state.get(GENERATED, {}), state[PUBLISHED]
+            result.update(status="published", title=generated.get("title", ""), body=generated.get("body", ""),
+                          post_id=published["post_id"], post_url=published["post_url"], resumed=PUBLISHED,
+                          **{f"{role}_media_id": media_id for role, media_id in published.get("media", {}).items()})
+            return result
+        if dedupe and DUPLICATE in state:
+            result.update(status="duplicate", duplicate_of=state[DUPLICATE]["duplicate_of"], resumed=DUPLICATE)
+            return result
+
+        generated = state.get(GENERATED)
+        prompt_hash = main.prompt_hash(row["topic"], row["content_type"], row["keywords"]) if journal else None
+        if generated and generated["prompt_hash"] == prompt_hash:
+            title, body = generated["title"], generated["body"]
+            skipped.append(GENERATED)
+        else:
+            if dedupe:
+                matches = main.get_duplicate_index().check_topic(row["topic"])
+                if matches:
+                    result.update(status="duplicate", duplicate_of=_describe_matches(matches))
+                    if journal:
+                        journal.record(key, DUPLICATE, duplicate_of=result["duplicate_of"])
+                    return result
+            title, body = main.generate_content(row["topic"], row["content_type"], row["keywords"], use_cache=use_cache)
+            if not body or title.startswith("Error"):
+                result.update(status="failed", error=title or "Empty response")
+                if journal:
+                    journal.record(key, FAILED, during=stage, error=result["error"])
+                return result
+            if journal:
+                journal.record(key, GENERATED, prompt_hash=prompt_hash, title=title, body=body)
+        result.update(status="generated", title=title, body=body)
+        if dedupe:
+            matches = main.get_duplicate_index().check_draft(body)
+            if matches:
+                result.update(status="duplicate", duplicate_of=_describe_matches(matches))
+                if journal:
+                    journal.record(key, DUPLICATE, duplicate_of=result["duplicate_of"])
+                return result
+
+        stage = IMAGE
+        images = _generate_images(row, state, journal, key, skipped)
+
+        if upload:
+            stage = PUBLISHED
+            # The outbox keeps uploaded media ids and finds a post created by an earlier run, so
+            # resuming after a crash mid-publish neither re-uploads the images nor posts twice.
+            outbox = main.get_publish_outbox()
+            outbox_key = outbox.enqueue(title, body, [images.get(role) for role in IMAGE_ROLES], row["content_type"])
+            entry = outbox.publish(outbox_key, attempts=int(main.get_config()["PUBLISH_ATTEMPTS"]))
+            media = {role: value[0] for role, value in entry["media"].items()}
+            if journal:
+                journal.record(key, PUBLISHED, post_id=entry["post_id"], post_url=entry["post_url"], media=media)
+            result.update(status="published", post_id=entry["post_id"], post_url=entry["post_url"],
+                          **{f"{role}_media_id": media_id for role, media_id in media.items()})
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+        if journal:
+            journal.record(key, FAILED, during=stage, error=str(e))
+    finally:
+        result["resumed"] = result["resumed"] or ",".join(skipped)
+        result["elapsed_s"] = round(time.monotonic() - started, 2)
+    return result
+
+
+def run_batch(rows, output_path, workers=4, upload=True, use_cache=True, dedupe=True, journal=None):
+    """Run every row through the pipeline on a bounded thread pool, streaming results to output_path."""
+    counts = {"published": 0, "generated": 0, "duplicate": 0, "failed": 0}
+    if dedupe:
+        main.get_duplicate_index()  # build once before the workers start
+    with ResultWriter(output_path) as writer, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_topic, i, row, upload, use_cache, dedupe, journal) for i, row in enumerate(rows)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            writer.write(result)
+            counts[result["status"]] += 1
+            resumed = f" [resumed: {result['resumed']}]" if result["resumed"] else ""
+            print(f"[{done}/{len(rows)}] {result['status']}: {result['topic'][:60]} ({result['elapsed_s']}s){resumed}")
+    return counts
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Generate content for every topic in a CSV/JSONL file.")
+    parser.add_argument("input", help="CSV or JSONL file with topic, content_type and keywords columns")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="CSV or JSONL result file")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="number of concurrent workers")
+    parser.add_argument("--no-upload", action="store_true", help="generate only, do not publish to WordPress")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache and always call the API")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="skip the near-duplicate check against the local WordPress mirror")
+    parser.add_argument("--journal", help="run journal to resume from (default: <output>.journal.sqlite3)")
+    parser.add_argument("--no-journal", action="store_true", help="do not record or resume progress")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"input file not found: {args.input}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    rows = read_topics(args.input)
+    journal = None
+    if not args.no_journal:
+        journal = RunJournal(args.journal or os.path.splitext(args.output)[0] + ".journal.sqlite3")
+        print(f"Journal: {journal.path} ({journal.stats()['topics']} topics recorded)")
+    print(f"Processing {len(rows)} topics with {args.workers} workers -> {args.output}")
+    started = time.monotonic()
+    try:
+        counts = run_batch(rows, args.output, workers=args.workers, upload=not args.no_upload,
+                           use_cache=not args.no_cache, dedupe=not args.allow_duplicates, journal=journal)
+    finally:
+        if journal:
+            journal.close()
+    print(f"Done in {time.monotonic() - started:.1f}s: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    print(f"Cache: {main.get_content_cache().stats()}")
+    return 0 if not counts["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
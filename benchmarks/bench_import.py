@@ -0,0 +1,70 @@
+"""Import-time benchmark for main.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import            # wall time of a cold `import main`, best of N
+    python -m benchmarks.bench_import --top 15   # plus the slowest modules from -X importtime
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("streamlit", "openai", "httpx", "requests", "PIL", "markdownify", "numpy")
+
+PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - started\n"
+    "loaded = [m for m in {heavy!r} if m in sys.modules]\n"
+    "print(f'{{elapsed * 1000:.1f}} {{\",\".join(loaded)}}')\n"
+)
+
+
+def cold_import(module):
+    """Import module in a fresh interpreter; returns (milliseconds, heavy modules it pulled in)."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[0]), output[1].split(",") if len(output) > 1 else []
+
+
+def slowest_modules(module, top):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="show the N slowest imports (cumulative)")
+    args = parser.parse_args(argv)
+
+    timings = []
+    loaded = []
+    for _ in range(args.runs):
+        elapsed, loaded = cold_import(args.module)
+        timings.append(elapsed)
+    print(f"import {args.module}: best {min(timings):.1f} ms, median {statistics.median(timings):.1f} ms over {args.runs} runs")
+    print(f"heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+    if args.top:
+        print(f"\n{'cumulative':>12} {'self':>10}  module")
+        for cumulative_us, self_us, name in slowest_modules(args.module, args.top):
+            print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,205 @@
+"""End-to-end pipeline benchmark against local OpenAI and WordPress stand-ins (no quota, no qa site).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline                                   # every scenario, defaults
+    python -m benchmarks.bench_pipeline pipeline -c 8 -n 32 --llm-latency 2 --error-rate 0.05
+    python -m benchmarks.bench_pipeline content --stream --json > before.json
+    python -m benchmarks.bench_pipeline content -n 200 --stall-rate 0.02 --stall-latency 60 [--no-hedge]
+    python -m benchmarks.bench_pipeline candidates -k 3                   # k drafts in one call
+
+Scenarios: content (generate_content), candidates (generate_candidates, k completions in one call),
+image (generate_image), upload (upload_to_wordpress with two fresh images), pipeline (content + two
+images + upload per request). Each prints wall time,
+throughput, end-to-end p50/p95/p99 and the per-stage breakdown recorded by tracing.py; measure a
+performance change by running the same command before and after it.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+import tracing
+from benchmarks.stub_servers import StubServers, add_config_arguments, config_from_args
+from image_asset import ImageAsset
+
+SCENARIOS = ("content", "candidates", "image", "upload", "pipeline")
+TOPIC = "Reducing changeover time on a CNC line"
+
+
+# --- Work units ---
+def _content(i, stream):
+    topic = f"{TOPIC} #{i}"
+    if stream:
+        title, body = "", ""
+        for title, body, done in main.generate_content_stream(topic, use_cache=False):
+            pass
+    else:
+        title, body = main.generate_content(topic, use_cache=False)
+    if title.startswith("Error") or not body:
+        raise RuntimeError(title or "empty body")
+    return title, body
+
+
+def _candidates(i, k):
+    ranked = main.generate_candidates(f"{TOPIC} #{i}", n=k, use_cache=False)
+    if len(ranked) != k:
+        raise RuntimeError(f"{len(ranked)} of {k} candidates")
+    return ranked
+
+
+def _image(i):
+    image = main.generate_image(f"Factory floor illustration #{i}")
+    if image is None:
+        raise RuntimeError("no image")
+    return image
+
+
+def _noise_image(size):
+    from PIL import Image
+
+    # Distinct bytes per request so the media index never short-circuits an upload.
+    image = Image.frombytes("RGB", (size // 8, size // 8), os.urandom(3 * (size // 8) ** 2)).resize((size, size))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return ImageAsset(buffer.getvalue())
+
+
+def _upload(title, body, images):
+    post_id, link = main.upload_to_wordpress(title, body, images)
+    if not post_id:
+        raise RuntimeError("no post id")
+    return post_id
+
+
+def make_work(scenario, stream, image_size, candidates=3):
+    if scenario == "content":
+        return lambda i: _content(i, stream)
+    if scenario == "candidates":
+        return lambda i: _candidates(i, candidates)
+    if scenario == "image":
+        return _image
+    if scenario == "upload":
+        return lambda i: _upload(f"Benchmark post #{i}", "<p>Benchmark body</p>",
+                                 [_noise_image(image_size), _noise_image(image_size)])
+
+    def pipeline(i):
+        title, body = _content(i, stream)
+        # Featured and content images are generated side by side, as in the app.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(tracing.bind(_image), i) for _ in range(2)]
+            images = [future.result() for future in futures]
+        return _upload(title, body, images)
+    return pipeline
+
+
+# --- Runner ---
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def _retries():
+    return sum(stats["retries"] for stats in main.rate_limit_stats().values())
+
+
+def run_scenario(scenario, requests, concurrency, stream=False, image_size=1024, candidates=3):
+    """Run `requests` work units `concurrency` at a time; return wall time, throughput and stage stats."""
+    tracing.get_tracer().reset()
+    retries = _retries()
+    hedges = main.get_model_router().stats()["hedges"]
+    work = make_work(scenario, stream, image_size, candidates)
+    latencies, errors = [], []
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            with tracing.trace(f"bench.{scenario}"):
+                work(i)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    stages = tracing.get_tracer().summary()
+    stages.pop(f"bench.{scenario}", None)
+    return {
+        "scenario": scenario, "requests": requests, "concurrency": concurrency, "stream": stream,
+        "errors": len(errors), "first_error": errors[0] if errors else None,
+        "wall_s": wall, "throughput_rps": requests / wall if wall else 0.0,
+        "p50_s": _percentile(latencies, 0.50), "p95_s": _percentile(latencies, 0.95),
+        "p99_s": _percentile(latencies, 0.99),
+        "rate_limit_retries": _retries() - retries,
+        "hedges": main.get_model_router().stats()["hedges"] - hedges,
+        "stages": stages,
+    }
+
+
+def print_result(result):
+    print(f"\n{result['scenario']}: {result['requests']} requests, concurrency {result['concurrency']}"
+          f"{', streamed' if result['stream'] else ''}")
+    print(f"  wall {result['wall_s']:.2f}s  throughput {result['throughput_rps']:.2f} req/s  "
+          f"p50 {result['p50_s']:.3f}s  p95 {result['p95_s']:.3f}s  p99 {result['p99_s']:.3f}s  "
+          f"errors {result['errors']}  rate-limit retries {result['rate_limit_retries']}  hedges {result['hedges']}")
+    if result["first_error"]:
+        print(f"  first error: {result['first_error'][:200]}")
+    print(f"  {'stage':<20}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, s in result["stages"].items():
+        print(f"  {name:<20}{s['count']:>7}{s['errors']:>8}{s['p50_s']:>8.3f}s{s['p95_s']:>8.3f}s{s['p99_s']:>8.3f}s")
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"one or more of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("-n", "--requests", type=int, default=16, help="work units per scenario")
+    parser.add_argument("--stream", action="store_true", help="use generate_content_stream for content")
+    parser.add_argument("-k", "--candidates", type=int, default=3, help="completions per candidates request")
+    parser.add_argument("--json", action="store_true", help="print results as JSON instead of tables")
+    parser.add_argument("--no-hedge", action="store_true", help="turn off hedged chat requests")
+    parser.add_argument("--hedge-after", type=float, default=45.0, help="hedge delay until a p95 is known")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp, StubServers(config_from_args(args)) as stubs:
+        main.configure(
+            OPENAI_API_KEY="sk-benchmark", OPENAI_BASE_URL=stubs.openai_url,
+            WORDPRESS_URL=stubs.wordpress_url, WORDPRESS_USERNAME="bench", WORDPRESS_PASSWORD="bench",
+            CONTENT_CACHE_PATH=os.path.join(tmp, "content_cache.sqlite3"),
+            MEDIA_INDEX_PATH=os.path.join(tmp, "media_index.sqlite3"),
+            # Never the real outbox: an entry left pending here would later be dispatched to the live site.
+            PUBLISH_OUTBOX_PATH=os.path.join(tmp, "publish_outbox.sqlite3"),
+            TRACE_LOG_PATH=os.path.join(tmp, "traces.jsonl"),
+            # Client-side limits sized for the stub, so the numbers measure the pipeline itself.
+            OPENAI_RPM=1_000_000, OPENAI_TPM=1_000_000_000, OPENAI_IMAGE_RPM=1_000_000,
+            HEDGE_REQUESTS=not args.no_hedge, HEDGE_AFTER=args.hedge_after,
+        )
+        results = []
+        for scenario in args.scenarios or SCENARIOS:
+            result = run_scenario(scenario, args.requests, args.concurrency, args.stream, args.image_size,
+                                  args.candidates)
+            results.append(result)
+            if not args.json:
+                print_result(result)
+        if args.json:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        print(f"\nWordPress stub items: {stubs.store.counts()}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,190 @@
+"""Golden-file check and throughput benchmark for text_format.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_text_format --check          # golden files + equivalence fuzz
+    python -m benchmarks.bench_text_format --seconds 3      # documents/second, old vs new
+    python -m benchmarks.bench_text_format --update-golden  # after an intentional output change
+
+Drop more archived GPT outputs into benchmarks/corpus/*.txt to widen both the check and the benchmark.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import text_format
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+# --- Reference implementation (the original main.py utilities, kept verbatim) ---
+def legacy_extract_title_and_body(text):
+    title = ""
+    body = ""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if line.startswith('Title:'):
+            title = line[6:].strip()
+            body = '\n'.join(lines[i+1:]).strip()
+            break
+        elif i == 0 and not line.startswith('Body:') and not line.startswith('Introduction:'):
+            title = line.strip()
+            body = '\n'.join(lines[1:]).strip()
+            break
+    if not title:
+        title_start = text.lower().find("title:")
+        body_start = text.lower().find("body:")
+        if title_start != -1 and body_start != -1 and body_start > title_start:
+            title = text[title_start + len("title:"):body_start].strip()
+            body = text[body_start + len("body:"):].strip()
+        else:
+            first_line = lines[0].strip()
+            if first_line:
+                title = first_line
+                body = '\n'.join(lines[1:]).strip()
+            else:
+                body = text.strip()
+    body = legacy_clean_body_text(body)
+    body = legacy_format_body_text(body)
+    return title, body
+
+
+def legacy_format_body_text(text):
+    sections = [
+        "Problem Statement:", "How sfHawk Helps:", "Benefits:", "Conclusion:",
+        "Introduction:", "Main Content:", "Key Points:", "Summary:"
+    ]
+    for section in sections:
+        text = re.sub(rf"\n*{re.escape(section)}", f"\n{section}", text)
+    text = text.replace("**", "")
+    for section in sections:
+        text = text.replace(section, f"**{section}**")
+    text = text.replace("\n\n\n", "\n\n")
+    return text.strip()
+
+
+def legacy_clean_body_text(text):
+    if text.lstrip().startswith('Body:'):
+        text = text[text.find('Body:') + 5:].lstrip()
+    lines = text.split('\n')
+    cleaned_lines = [line.strip() for line in lines if line.strip()]
+    return '\n'.join(cleaned_lines)
+
+
+# --- Corpus ---
+def load_corpus():
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))):
+        with open(path, encoding="utf-8", newline="") as f:
+            corpus[path] = f.read()
+    return corpus
+
+
+def golden_path(path):
+    return path[:-len(".txt")] + ".golden.json"
+
+
+def fuzz_documents(count, seed=0):
+    """Random documents built from the tokens the normalizer cares about."""
+    rng = random.Random(seed)
+    tokens = list(text_format.SECTIONS) + [
+        "\n", "\n", "\n\n", "**", "*", " ", "  ", "\t", "Title:", "title:", "Body:", "BODY:",
+        "Intro", "word", "sfHawk", "## ", "- ", "Bene", "fits:", " ", " ",
+    ]
+    return [
+        "".join(rng.choice(tokens) for _ in range(rng.randint(0, 60)))
+        for _ in range(count)
+    ]
+
+
+# --- Check ---
+def check(fuzz_count):
+    failures = 0
+    for path, text in load_corpus().items():
+        result = list(text_format.extract_title_and_body(text))
+        if result != list(legacy_extract_title_and_body(text)):
+            failures += 1
+            print(f"MISMATCH (legacy) {os.path.basename(path)}")
+        golden = golden_path(path)
+        if not os.path.exists(golden):
+            failures += 1
+            print(f"MISSING golden file for {os.path.basename(path)} (run with --update-golden)")
+            continue
+        with open(golden, encoding="utf-8") as f:
+            expected = json.load(f)
+        if result != [expected["title"], expected["body"]]:
+            failures += 1
+            print(f"MISMATCH (golden) {os.path.basename(path)}")
+
+    for text in fuzz_documents(fuzz_count):
+        checks = (
+            (text_format.extract_title_and_body, legacy_extract_title_and_body),
+            (text_format.format_body_text, legacy_format_body_text),
+            (text_format.clean_body_text, legacy_clean_body_text),
+        )
+        for new, old in checks:
+            if new(text) != old(text):
+                failures += 1
+                print(f"MISMATCH ({new.__name__}) on fuzz input {text!r}")
+    print("OK" if not failures else f"{failures} mismatches")
+    return failures
+
+
+def update_golden():
+    for path, text in load_corpus().items():
+        title, body = legacy_extract_title_and_body(text)
+        with open(golden_path(path), "w", encoding="utf-8") as f:
+            json.dump({"title": title, "body": body}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"wrote {os.path.basename(golden_path(path))}")
+
+
+# --- Benchmark ---
+def throughput(fn, documents, seconds):
+    processed = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for text in documents:
+            fn(text)
+        processed += len(documents)
+    return processed / (time.perf_counter() - started)
+
+
+def benchmark(seconds):
+    documents = list(load_corpus().values())
+    if not documents:
+        print(f"No corpus documents in {CORPUS_DIR}")
+        return
+    average = sum(map(len, documents)) / len(documents)
+    print(f"{len(documents)} documents, {average:.0f} chars on average, {seconds}s per run")
+    old = throughput(legacy_extract_title_and_body, documents, seconds)
+    new = throughput(text_format.extract_title_and_body, documents, seconds)
+    print(f"legacy      {old:12,.0f} docs/s")
+    print(f"text_format {new:12,.0f} docs/s  ({new / old:.2f}x)")
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="verify golden files and old/new equivalence")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite golden files from the reference")
+    parser.add_argument("--fuzz", type=int, default=5000, help="random documents to compare in --check")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each benchmark run")
+    args = parser.parse_args(argv)
+
+    if args.update_golden:
+        update_golden()
+        return 0
+    if args.check:
+        return 1 if check(args.fuzz) else 0
+    benchmark(args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
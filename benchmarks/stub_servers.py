@@ -0,0 +1,333 @@
+"""Local stand-ins for the OpenAI and WordPress endpoints main.py calls.
+
+Run from the repository root, then point OPENAI_BASE_URL / WORDPRESS_URL at them:
+
+    python -m benchmarks.stub_servers --openai-port 8701 --wordpress-port 8702 --llm-latency 2 --error-rate 0.05
+    python -m benchmarks.stub_servers --stall-rate 0.02 --stall-latency 120   # occasional multi-minute stalls
+
+OpenAI:     POST /v1/chat/completions (plain with n choices, stream=true), POST /v1/images/generations (b64_json)
+WordPress:  POST /wp-json/wp/v2/media, POST /wp-json/wp/v2/{posts,use-case,pages},
+            GET  /wp-json/wp/v2/media/<id> and paginated GET of the post type routes
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "production scheduling machine capacity throughput shop floor automation sfHawk planning "
+    "downtime visibility operators orders lead time quality delivery analytics real-time"
+).split()
+
+
+class StubConfig:
+    """Latency (seconds, +/- jitter), error rates and payload sizes of the stand-in servers."""
+
+    def __init__(self, llm_latency=1.0, ttft=0.3, image_latency=1.5, wordpress_latency=0.1, jitter=0.2,
+                 error_rate=0.0, completion_words=600, image_size=1024, stall_rate=0.0, stall_latency=120.0, seed=None):
+        self.llm_latency = llm_latency
+        self.ttft = ttft
+        self.image_latency = image_latency
+        self.wordpress_latency = wordpress_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.completion_words = completion_words
+        self.image_size = image_size
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, seconds):
+        with self._lock:
+            factor = 1 + self.random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds * factor)
+
+    def llm_latency_for_request(self):
+        """Chat latency for one request: the usual one, or a stall for stall_rate of requests."""
+        with self._lock:
+            stalled = self.random.random() < self.stall_rate
+        return self.stall_latency if stalled else self.llm_latency
+
+    def fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+    def words(self, count):
+        with self._lock:
+            return [self.random.choice(WORDS) for _ in range(count)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, payload=None, headers=None, raw=None, content_type="application/json"):
+        data = raw if raw is not None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# --- OpenAI ---
+class OpenAIHandler(_Handler):
+    def do_POST(self):
+        request = json.loads(self._body() or b"{}")
+        if self.config.fail():
+            self.config.delay(0.05)
+            return self._send(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests",
+                                              "code": "rate_limit_exceeded"}}, headers={"retry-after-ms": 200})
+        if self.path.endswith("/chat/completions"):
+            return self._chat(request)
+        if self.path.endswith("/images/generations"):
+            return self._image(request)
+        self._send(404, {"error": {"message": f"unknown route {self.path}"}})
+
+    def _completion_text(self):
+        words = self.config.words(self.config.completion_words)
+        sections = ("Introduction:", "Main Content:", "Key Points:", "Conclusion:")
+        per_section = max(1, len(words) // len(sections))
+        parts = [f"{section} {' '.join(words[i * per_section:(i + 1) * per_section])}"
+                 for i, section in enumerate(sections)]
+        return f"Title: Stub {' '.join(words[:4]).title()}\nBody:\n" + "\n\n".join(parts)
+
+    def _chat(self, request):
+        texts = [self._completion_text() for _ in range(max(1, int(request.get("n") or 1)))]
+        text = texts[0]
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion_tokens = sum(len(t) for t in texts) // 4
+        headers = {"x-ratelimit-remaining-requests": 10000, "x-ratelimit-remaining-tokens": 1000000}
+        latency = self.config.llm_latency_for_request()
+        if not request.get("stream"):
+            self.config.delay(latency)
+            return self._send(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "gpt-4"),
+                "choices": [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": t}}
+                            for i, t in enumerate(texts)],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }, headers=headers)
+
+        # Stream in ~5-word deltas spread over the remaining latency after the first token.
+        pieces = [piece + " " for piece in text.replace("\n", "\n ").split(" ")]
+        deltas = ["".join(pieces[i:i + 5]).replace("\n ", "\n") for i in range(0, len(pieces), 5)]
+        step = max(0.0, latency - self.config.ttft) / max(1, len(deltas))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for key, value in headers.items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.config.delay(self.config.ttft)
+        for delta in deltas:
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": request.get("model", "gpt-4"),
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if step:
+                time.sleep(step)
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _image(self, request):
+        from PIL import Image
+
+        self.config.delay(self.config.image_latency)
+        size = self.config.image_size
+        # Noise, so every image is distinct (no media index reuse) and costs a realistic encode.
+        image = Image.frombytes("RGB", (size // 8, size // 8), os.urandom(3 * (size // 8) ** 2)).resize((size, size))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        self._send(200, {"created": int(time.time()),
+                         "data": [{"b64_json": base64.b64encode(buffer.getvalue()).decode("ascii")}]})
+
+
+# --- WordPress ---
+class WordPressHandler(_Handler):
+    store = None
+
+    def _route(self):
+        path = urlparse(self.path).path
+        prefix = "/wp-json/wp/v2/"
+        return path[len(prefix):].strip("/") if path.startswith(prefix) else None
+
+    def do_POST(self):
+        route = self._route()
+        body = self._body()
+        self.config.delay(self.config.wordpress_latency)
+        if self.config.fail():
+            return self._send(503, {"code": "stub_unavailable", "message": "stub failure"}, headers={"Retry-After": 0})
+        if route == "media":
+            item = self.store.add("media", {"bytes": len(body)})
+            item["source_url"] = f"http://{self.headers.get('Host')}/uploads/{item['id']}"
+            return self._send(201, item)
+        if route in self.store.types:
+            data = json.loads(body or b"{}")
+            item = self.store.add(route, {"title": {"rendered": data.get("title", "")}, "status": data.get("status"),
+                                          "meta": data.get("meta", {}), "slug": f"item-{len(self.store.types[route]) + 1}"})
+            item["link"] = f"http://{self.headers.get('Host')}/{route}/{item['id']}"
+            return self._send(201, item)
+        self._send(404, {"code": "rest_no_route"})
+
+    def do_GET(self):
+        route = self._route() or ""
+        self.config.delay(self.config.wordpress_latency)
+        kind, _, item_id = route.partition("/")
+        if kind in self.store.types and item_id:
+            item = self.store.get(kind, int(item_id))
+            return self._send(200, item) if item else self._send(404, {"code": "rest_post_invalid_id"})
+        if route in self.store.types:
+            query = parse_qs(urlparse(self.path).query)
+            per_page = int(query.get("per_page", ["10"])[0])
+            page = int(query.get("page", ["1"])[0])
+            items = self.store.list(route)
+            search = query.get("search", [""])[0].lower()
+            if search:
+                items = [item for item in items if search in str(item.get("title", {}).get("rendered", "")).lower()]
+            total_pages = max(1, -(-len(items) // per_page))
+            return self._send(200, items[(page - 1) * per_page:page * per_page],
+                              headers={"X-WP-Total": len(items), "X-WP-TotalPages": total_pages})
+        self._send(404, {"code": "rest_no_route"})
+
+    def do_DELETE(self):
+        route = self._route() or ""
+        self.config.delay(self.config.wordpress_latency)
+        kind, _, item_id = route.partition("/")
+        item = self.store.delete(kind, int(item_id or 0))
+        self._send(200 if item else 404, {"deleted": bool(item), "previous": item})
+
+
+class WordPressStore:
+    """In-memory media and post items, shared by the handler threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.types = {"media": {}, "posts": {}, "use-case": {}, "pages": {}}
+
+    def add(self, kind, fields):
+        with self._lock:
+            item = {"id": self._next_id, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), **fields}
+            item["modified"] = item["modified_gmt"] = item["date"]
+            self.types[kind][item["id"]] = item
+            self._next_id += 1
+            return item
+
+    def get(self, kind, item_id):
+        with self._lock:
+            return self.types[kind].get(item_id)
+
+    def list(self, kind):
+        with self._lock:
+            return list(self.types[kind].values())
+
+    def delete(self, kind, item_id):
+        with self._lock:
+            return self.types.get(kind, {}).pop(item_id, None)
+
+    def counts(self):
+        with self._lock:
+            return {kind: len(items) for kind, items in self.types.items()}
+
+
+class StubServers:
+    """Both stand-ins on background threads: `with StubServers(config) as stubs: stubs.openai_url ...`"""
+
+    def __init__(self, config=None, host="127.0.0.1", openai_port=0, wordpress_port=0):
+        self.config = config or StubConfig()
+        self.store = WordPressStore()
+        openai_handler = type("BoundOpenAIHandler", (OpenAIHandler,), {"config": self.config})
+        wordpress_handler = type("BoundWordPressHandler", (WordPressHandler,), {"config": self.config, "store": self.store})
+        self._servers = [
+            ThreadingHTTPServer((host, openai_port), openai_handler),
+            ThreadingHTTPServer((host, wordpress_port), wordpress_handler),
+        ]
+        for server in self._servers:
+            server.daemon_threads = True
+        self.openai_url = f"http://{host}:{self._servers[0].server_address[1]}/v1"
+        self.wordpress_url = f"http://{host}:{self._servers[1].server_address[1]}"
+
+    def start(self):
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per chat completion")
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds to the first streamed token")
+    parser.add_argument("--image-latency", type=float, default=1.5, help="seconds per image generation")
+    parser.add_argument("--wordpress-latency", type=float, default=0.1, help="seconds per WordPress request")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction applied to every latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 (OpenAI) / 503 (WordPress) responses")
+    parser.add_argument("--completion-words", type=int, default=600)
+    parser.add_argument("--image-size", type=int, default=1024, help="generated image width and height")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of chat completions that stall")
+    parser.add_argument("--stall-latency", type=float, default=120.0, help="seconds a stalled completion takes")
+    parser.add_argument("--seed", type=int)
+
+
+def config_from_args(args):
+    return StubConfig(
+        llm_latency=args.llm_latency, ttft=args.ttft, image_latency=args.image_latency,
+        wordpress_latency=args.wordpress_latency, jitter=args.jitter, error_rate=args.error_rate,
+        completion_words=args.completion_words, image_size=args.image_size,
+        stall_rate=args.stall_rate, stall_latency=args.stall_latency, seed=args.seed,
+    )
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8701)
+    parser.add_argument("--wordpress-port", type=int, default=8702)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with StubServers(config_from_args(args), args.host, args.openai_port, args.wordpress_port) as stubs:
+        print(f"OPENAI_BASE_URL={stubs.openai_url}")
+        print(f"WORDPRESS_URL={stubs.wordpress_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run_cli())
@@ -0,0 +1,79 @@
+import re
+
+__all__ = ['score_candidate', 'rank_candidates', 'LENGTH_LIMITS', 'REQUIRED_SECTIONS', 'WEIGHTS']
+
+# Body word ranges the prompts ask for; outside them the length score falls off proportionally.
+LENGTH_LIMITS = {
+    "Case Study": (150, 250),
+    "Blog": (800, 2000),
+}
+
+# Headers each prompt requires, matched case-insensitively at the start of a line.
+REQUIRED_SECTIONS = {
+    "Case Study": ("Summary", "Problem Statement", "How sfHawk Helps", "Benefits"),
+    "Blog": ("Introduction", "Conclusion"),
+}
+
+WEIGHTS = {"keywords": 0.4, "length": 0.3, "sections": 0.3}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_MARKUP_RE = re.compile(r"[*#>_`]+")
+
+
+def _plain_text(text):
+    return _MARKUP_RE.sub(" ", _TAG_RE.sub(" ", text or ""))
+
+
+def _keywords(keywords):
+    return [k.strip().lower() for k in (keywords or "").split(",") if k.strip()]
+
+
+def keyword_coverage(title, body, keywords):
+    """Share of the comma-separated keywords found in the title or body (1.0 without keywords)."""
+    wanted = _keywords(keywords)
+    if not wanted:
+        return 1.0
+    text = " ".join(_plain_text(f"{title}\n{body}").lower().split())
+    return sum(1 for k in wanted if " ".join(k.split()) in text) / len(wanted)
+
+
+def length_compliance(body, content_type):
+    """1.0 inside the content type's word range, the ratio to the nearest bound outside it."""
+    words = len(_plain_text(body).split())
+    low, high = LENGTH_LIMITS.get(content_type, (0, float("inf")))
+    if words < low:
+        return words / low
+    if words > high:
+        return high / words
+    return 1.0
+
+
+def section_presence(body, content_type):
+    """Share of the content type's required section headers that start a line of the body."""
+    sections = REQUIRED_SECTIONS.get(content_type, ())
+    if not sections:
+        return 1.0
+    lines = [line.strip(" *#:?").lower() for line in _plain_text(body).splitlines()]
+    return sum(1 for s in sections if any(line.startswith(s.lower()) for line in lines)) / len(sections)
+
+
+def score_candidate(title, body, content_type="Case Study", keywords=None):
+    """Per-scorer values in [0, 1] plus their weighted total; an empty title or body scores 0."""
+    scores = {
+        "keywords": keyword_coverage(title, body, keywords),
+        "length": length_compliance(body, content_type),
+        "sections": section_presence(body, content_type),
+    }
+    total = sum(WEIGHTS[name] * value for name, value in scores.items())
+    scores["total"] = round(total if title and body else 0.0, 3)
+    return scores
+
+
+def rank_candidates(candidates, content_type="Case Study", keywords=None):
+    """[{title, body, scores}] best first; ties keep the order the completions came back in."""
+    ranked = [
+        {"title": title, "body": body, "scores": score_candidate(title, body, content_type, keywords)}
+        for title, body in candidates
+    ]
+    ranked.sort(key=lambda c: c["scores"]["total"], reverse=True)
+    return ranked
@@ -0,0 +1,127 @@
+"""List everything of one post type on a WordPress site, or the post types themselves.
+
+Run from the repository root:
+
+    python -m details.inventory pages
+    python -m details.inventory use-case --format csv > use-cases.csv
+    python -m details.inventory posts --format jsonl --status any
+    python -m details.inventory types
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+import requests
+from wordpress import WordPressClient
+
+# === CONFIG ===
+BASE_URL = "https://qa.sfhawk.com"
+FIELDS = "id,slug,title,template,status,link"
+COLUMNS = ["ID", "Slug", "Title", "Template", "Status", "Link"]
+# Fixed widths so the table can be printed row by row instead of after the last page.
+TABLE_WIDTHS = [7, 40, 50, 20, 10, 0]
+
+
+def to_row(item):
+    return [
+        item["id"],
+        item["slug"],
+        item["title"]["rendered"],
+        item.get("template", "default") or "default",
+        item["status"],
+        item["link"],
+    ]
+
+
+# --- Output ---
+def _cell(value, width):
+    text = str(value)
+    if width and len(text) > width:
+        text = text[:width - 1] + "…"
+    return text.ljust(width) if width else text
+
+
+def write_table(rows, out):
+    line = "  ".join(_cell(column, width) for column, width in zip(COLUMNS, TABLE_WIDTHS))
+    out.write(line + "\n" + "-" * len(line) + "\n")
+    count = 0
+    for row in rows:
+        out.write("  ".join(_cell(value, width) for value, width in zip(row, TABLE_WIDTHS)).rstrip() + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows, out):
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, out):
+    keys = [column.lower() for column in COLUMNS]
+    count = 0
+    for row in rows:
+        out.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+WRITERS = {"table": write_table, "csv": write_csv, "jsonl": write_jsonl}
+
+
+# --- Commands ---
+def list_types(wp, out):
+    response = wp.get("types")
+    response.raise_for_status()
+    out.write("Available post types:\n\n")
+    for slug, info in response.json().items():
+        out.write(f"{slug} -> {info['name']} (route: {info.get('rest_base') or slug})\n")
+
+
+def list_items(wp, route, output_format, out, status=None, per_page=100, workers=8):
+    params = {"status": status} if status else None
+    rows = (to_row(item) for item in wp.iter_items(route, params=params, fields=FIELDS,
+                                                    per_page=per_page, workers=workers))
+    count = WRITERS[output_format](rows, out)
+    out.flush()
+    return count
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("route", help="post type route (pages, posts, use-case, ...) or 'types'")
+    parser.add_argument("-f", "--format", choices=sorted(WRITERS), default="table")
+    parser.add_argument("--status", help="e.g. 'any' or 'draft' (needs WORDPRESS_USERNAME/WORDPRESS_PASSWORD)")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("-w", "--workers", type=int, default=8, help="concurrent page requests")
+    parser.add_argument("--per-page", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    wp = WordPressClient(args.base_url, os.environ.get("WORDPRESS_USERNAME"), os.environ.get("WORDPRESS_PASSWORD"),
+                         pool_size=max(args.workers, 1))
+    try:
+        if args.route == "types":
+            list_types(wp, sys.stdout)
+        else:
+            print(f"📄 Fetching {args.route} from: {wp.url(args.route)}", file=sys.stderr)
+            count = list_items(wp, args.route, args.format, sys.stdout, args.status, args.per_page, args.workers)
+            print(f"{count} items", file=sys.stderr)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into e.g. `head`; stop quietly.
+        sys.stdout = open(os.devnull, "w")
+    finally:
+        wp.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
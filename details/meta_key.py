@@ -1,23 +1,26 @@
+"""Print the REST-visible meta fields of one use-case post (set POST_ID below).
+
+Run from the repository root, so the shared WordPressClient in wordpress.py can be imported:
+
+    python -m details.meta_key
+"""
+import os
 import requests
-from requests.auth import HTTPBasicAuth
 import json
+from wordpress import WordPressClient
 
 # === CONFIGURATION ===
 WORDPRESS_URL = "https://qa.sfhawk.com"
 POST_ID = 123  # Replace with the actual post ID of a "use-case" post
-USERNAME = WORDPRESS_USERNAME
-APP_PASSWORD = WORDPRESS_PASSWORD  # Use an Application Password, NOT your login
+USERNAME = os.environ.get("WORDPRESS_USERNAME")
+APP_PASSWORD = os.environ.get("WORDPRESS_PASSWORD")  # Use an Application Password, NOT your login
 
 # === API Endpoint ===
-API_ENDPOINT = f"{WORDPRESS_URL}/wp-json/wp/v2/use-case/{POST_ID}"
+wp = WordPressClient(WORDPRESS_URL, USERNAME, APP_PASSWORD)
+ROUTE = f"use-case/{POST_ID}"
 
 try:
-    response = requests.get(
-        API_ENDPOINT,
-        auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
-        headers={"Content-Type": "application/json"},
-        verify=False  # Ignore SSL errors if needed
-    )
+    response = wp.get(ROUTE, fields="meta")
 
     response.raise_for_status()
     data = response.json()
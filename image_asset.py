@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+__all__ = ['ImageAsset']
+
+
+class ImageAsset:
+    """An image kept once as raw bytes; decoding, hashing and thumbnails happen lazily and are memoized."""
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self._digest = None
+        self._image = None
+        self._thumbnails = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_base64(cls, image_data):
+        return cls(base64.b64decode(image_data))
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept an ImageAsset, raw bytes or a base64 string (the old image format) and return an ImageAsset."""
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls(value)
+        if isinstance(value, str):
+            return cls.from_base64(value)
+        raise TypeError(f"Unsupported image value: {type(value).__name__}")
+
+    def save(self, directory):
+        """Write the bytes to directory/<digest> durably (fsync, then rename) unless already there; returns the path."""
+        path = os.path.join(directory, self.digest)
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return path
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def b64(self):
+        # Not memoized on purpose: keeping a base64 copy around is what this class avoids.
+        return base64.b64encode(self.data).decode('utf-8')
+
+    def _open(self):
+        from PIL import Image
+        return Image.open(io.BytesIO(self.data))
+
+    @property
+    def image(self):
+        """The fully decoded PIL image (shared; copy before mutating)."""
+        with self._lock:
+            if self._image is None:
+                image = self._open()
+                image.load()
+                self._image = image
+            return self._image
+
+    @property
+    def size(self):
+        if self._image is not None:
+            return self._image.size
+        return self._open().size  # header only, no pixel decode
+
+    def thumbnail(self, max_size=(320, 320)):
+        """A downscaled copy for previews; does not keep the full decode alive."""
+        max_size = tuple(max_size)
+        with self._lock:
+            thumb = self._thumbnails.get(max_size)
+            if thumb is not None:
+                return thumb
+            source = self._image
+        if source is None:
+            source = self._open()
+            source.draft("RGB", max_size)  # JPEG: decode at reduced scale
+        thumb = source.copy() if source is self._image else source
+        thumb.thumbnail(max_size, reducing_gap=2.0)
+        with self._lock:
+            self._thumbnails[max_size] = thumb
+        return thumb
+
+    def release(self):
+        """Drop the decoded image and thumbnails, keeping only the raw bytes."""
+        with self._lock:
+            self._image = None
+            self._thumbnails.clear()
@@ -0,0 +1,125 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+__all__ = ['Job', 'JobManager', 'QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED']
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """One background call: status, progress and either a result or an error.
+
+    The job function receives the Job as its first argument and may call update() to report
+    progress or a partial result (e.g. the text streamed so far).
+    """
+
+    def __init__(self, kind, owner=None, label=""):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.trace_id = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def update(self, progress=None, message=None, partial=None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def __repr__(self):
+        return f"Job({self.kind!r}, {self.id[:8]}, {self.status}, {self.progress:.0%})"
+
+
+class JobManager:
+    """Process-wide thread pool for slow calls; jobs outlive Streamlit reruns and page reloads.
+
+    Finished jobs are kept for keep_for seconds so a session (or a reloaded page) can collect them.
+    """
+
+    def __init__(self, max_workers=8, keep_for=3600):
+        self.keep_for = keep_for
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, owner=None, label="", **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the Job right away."""
+        job = Job(kind, owner, label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            # Each job is one traced run; its stages can be read back with tracing.get_tracer().breakdown().
+            with tracing.trace(f"job.{job.kind}") as root:
+                job.trace_id = root.trace_id
+                job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = SUCCEEDED
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.message = traceback.format_exc(limit=3)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_for
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,89 +1,283 @@
-import os
-import base64
-from PIL import Image
-import io
-import requests
-from requests.auth import HTTPBasicAuth
+import asyncio
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from prompts.CaseStudyPrompt import get_case_study_prompt
 from prompts.BlogPrompt import get_blog_prompt
-import streamlit as st
+from prompts.PromptRegistry import get_prompt_template
+from content_cache import make_cache_key
+from image_asset import ImageAsset
+from text_format import extract_title_and_body, clean_body_text, format_body_text, StreamingContentParser
+import tracing
 import collections
 import collections.abc
-from openai import OpenAI
-import httpx
-import re
 
 collections.Iterable = collections.abc.Iterable
 
-__all__ = ['generate_content', 'upload_to_wordpress', 'generate_image']
+__all__ = [
+    'generate_content', 'generate_content_stream', 'upload_to_wordpress', 'generate_image',
+    'agenerate_content', 'aupload_to_wordpress', 'agenerate_image', 'aclose_clients',
+    'get_config', 'configure', 'get_openai_client', 'get_wordpress_client', 'get_artifact_store',
+    'get_wp_mirror', 'get_duplicate_index', 'get_job_manager',
+    'get_rate_limiter', 'rate_limit_stats', 'get_model_router', 'upload_media', 'publish_post', 'prompt_hash',
+    'get_publish_outbox', 'find_published_post', 'post_exists', 'delete_media', 'generate_candidates',
+]
+
+# Heavy dependencies (streamlit, openai, httpx, requests, PIL) are imported on first use, and the
+# clients below are built lazily once per process, so importing this module stays cheap and
+# Streamlit reruns reuse the same pooled clients.
 
 # --- Configuration ---
-WORDPRESS_URL = st.secrets["WORDPRESS_URL"]
-WORDPRESS_USERNAME = st.secrets["WORDPRESS_USERNAME"]
-WORDPRESS_PASSWORD = st.secrets["WORDPRESS_PASSWORD"]
-OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+_DEFAULTS = {
+    "CONTENT_CACHE_PATH": ".cache/content_cache.sqlite3",
+    "CONTENT_CACHE_TTL": 7 * 24 * 3600,
+    "MEDIA_INDEX_PATH": ".cache/media_index.sqlite3",
+    # Reuse an uploaded image whose dHash is within this many bits; None reuses identical bytes only.
+    "MEDIA_MATCH_DISTANCE": None,
+    "TRACE_LOG_PATH": ".cache/traces.jsonl",
+    "WP_MIRROR_PATH": ".cache/wp_mirror.sqlite3",
+    "NEAR_DUPLICATE_PATH": ".cache/near_duplicates.npz",
+    "ARTIFACT_STORE_PATH": ".cache/artifacts",
+    "ARTIFACT_SESSION_BYTES": 32 * 1024 * 1024,
+    "ARTIFACT_TOTAL_BYTES": 256 * 1024 * 1024,
+    "JOB_WORKERS": 8,
+    # Our OpenAI plan's limits; the client-side limiter keeps requests under them.
+    "OPENAI_RPM": 500,
+    "OPENAI_TPM": 10000,
+    "OPENAI_IMAGE_RPM": 5,
+    # Per model {"rpm": n, "tpm": n}; models not listed use OPENAI_RPM / OPENAI_TPM.
+    "MODEL_RATE_LIMITS": None,
+    # None means api.openai.com; benchmarks point this at benchmarks/stub_servers.py.
+    "OPENAI_BASE_URL": None,
+    # Per content type {"models": [...], "max_tokens": n}; None uses model_router.DEFAULT_TIERS.
+    "MODEL_TIERS": None,
+    # Race a second model once a request passes its p95 (HEDGE_AFTER seconds until one is known).
+    "HEDGE_REQUESTS": True,
+    "HEDGE_AFTER": 45,
+    "PUBLISH_OUTBOX_PATH": ".cache/publish_outbox.sqlite3",
+    # Post meta key holding the outbox idempotency key; register it with show_in_rest on the site.
+    "IDEMPOTENCY_META_KEY": "content_pipeline_key",
+    "PUBLISH_ATTEMPTS": 3,
+}
+_REQUIRED = ("WORDPRESS_URL", "WORDPRESS_USERNAME", "WORDPRESS_PASSWORD", "OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in Streamlit secrets")
+_config = None
+_overrides = {}
+_resources = {}
+_resources_lock = threading.RLock()
 
-# --- OpenAI Client ---
-client = OpenAI(
-    api_key=OPENAI_API_KEY,
-    http_client=httpx.Client(timeout=60)
-)
+def get_config():
+    """Settings from Streamlit secrets (plus configure() overrides), read once."""
+    global _config
+    with _resources_lock:
+        if _config is None:
+            config = dict(_DEFAULTS)
+            keys = _REQUIRED + tuple(_DEFAULTS)
+            if any(key not in _overrides for key in keys):
+                import streamlit as st
+                try:
+                    config.update({key: st.secrets[key] for key in keys if key in st.secrets})
+                except FileNotFoundError:
+                    pass  # no secrets file; everything must come from configure()
+            config.update(_overrides)
+            missing = [key for key in _REQUIRED if key not in config]
+            if missing:
+                raise KeyError(f"{', '.join(missing)} not found in Streamlit secrets")
+            if not config["OPENAI_API_KEY"]:
+                raise ValueError("OPENAI_API_KEY not found in Streamlit secrets")
+            _config = config
+            tracing.get_tracer().path = config["TRACE_LOG_PATH"] or None
+        return _config
 
-# --- Utility Functions ---
-def extract_title_and_body(text):
-    title = ""
-    body = ""
-    lines = text.split('\n')
-    for i, line in enumerate(lines):
-        if line.startswith('Title:'):
-            title = line[6:].strip()
-            body = '\n'.join(lines[i+1:]).strip()
-            break
-        elif i == 0 and not line.startswith('Body:') and not line.startswith('Introduction:'):
-            title = line.strip()
-            body = '\n'.join(lines[1:]).strip()
-            break
-    if not title:
-        title_start = text.lower().find("title:")
-        body_start = text.lower().find("body:")
-        if title_start != -1 and body_start != -1 and body_start > title_start:
-            title = text[title_start + len("title:"):body_start].strip()
-            body = text[body_start + len("body:"):].strip()
-        else:
-            first_line = lines[0].strip()
-            if first_line:
-                title = first_line
-                body = '\n'.join(lines[1:]).strip()
-            else:
-                body = text.strip()
-    body = clean_body_text(body)
-    body = format_body_text(body)
-    return title, body
-
-def format_body_text(text):
-    sections = [
-        "Problem Statement:", "How sfHawk Helps:", "Benefits:", "Conclusion:",
-        "Introduction:", "Main Content:", "Key Points:", "Summary:"
-    ]
-    for section in sections:
-        text = re.sub(rf"\n*{re.escape(section)}", f"\n{section}", text)
-    text = text.replace("**", "")
-    for section in sections:
-        text = text.replace(section, f"**{section}**")
-    text = text.replace("\n\n\n", "\n\n")
-    return text.strip()
-
-def clean_body_text(text):
-    if text.lstrip().startswith('Body:'):
-        text = text[text.find('Body:') + 5:].lstrip()
-    lines = text.split('\n')
-    cleaned_lines = [line.strip() for line in lines if line.strip()]
-    return '\n'.join(cleaned_lines)
+def configure(**overrides):
+    """Override settings (e.g. from scripts or benchmarks) and drop clients built from the old ones."""
+    global _config
+    with _resources_lock:
+        _overrides.update(overrides)
+        _config = None
+        _resources.clear()
+
+def _resource(name, factory):
+    with _resources_lock:
+        if name not in _resources:
+            _resources[name] = factory()
+        return _resources[name]
+
+# --- Clients ---
+def get_openai_client():
+    def build():
+        import httpx
+        from openai import OpenAI
+        # Retries are handled by the shared rate limiter, which also paces other threads.
+        return OpenAI(
+            api_key=get_config()["OPENAI_API_KEY"],
+            base_url=get_config()["OPENAI_BASE_URL"],
+            http_client=httpx.Client(timeout=60),
+            max_retries=0
+        )
+    return _resource("openai", build)
+
+def get_rate_limiter(kind="chat", model=None):
+    """Shared limiter for "chat" (requests and tokens per minute) or "images" (requests per minute).
+
+    OpenAI enforces chat limits per model, so each model gets its own limiter: a 429 on one model
+    of a tier does not pause the others. MODEL_RATE_LIMITS overrides rpm/tpm for a model.
+    """
+    def build():
+        from rate_limit import RateLimiter
+        config = get_config()
+        if kind == "images":
+            return RateLimiter(rpm=int(config["OPENAI_IMAGE_RPM"]))
+        limits = dict((config["MODEL_RATE_LIMITS"] or {}).get(model) or {})
+        return RateLimiter(rpm=int(limits.get("rpm", config["OPENAI_RPM"])), tpm=int(limits.get("tpm", config["OPENAI_TPM"])))
+    return _resource(f"rate_limit_{kind}" + (f":{model}" if model else ""), build)
+
+def rate_limit_stats():
+    """{limiter name: stats} for every limiter built so far (e.g. "rate_limit_chat:gpt-4o")."""
+    with _resources_lock:
+        limiters = {name: value for name, value in _resources.items() if name.startswith("rate_limit_")}
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+def get_model_router():
+    """Shared per-content-type model routing with fallback and hedging."""
+    def build():
+        from model_router import ModelRouter
+        config = get_config()
+        tiers = config["MODEL_TIERS"]
+        return ModelRouter(
+            tiers={name: dict(tier) for name, tier in tiers.items()} if tiers else None,
+            hedge=bool(config["HEDGE_REQUESTS"]),
+            hedge_after=float(config["HEDGE_AFTER"]),
+        )
+    return _resource("model_router", build)
+
+def get_wordpress_client():
+    def build():
+        from wordpress import WordPressClient
+        config = get_config()
+        return WordPressClient(config["WORDPRESS_URL"], config["WORDPRESS_USERNAME"], config["WORDPRESS_PASSWORD"])
+    return _resource("wordpress", build)
+
+def get_content_cache():
+    def build():
+        from content_cache import ContentCache
+        config = get_config()
+        return ContentCache(config["CONTENT_CACHE_PATH"], max_entries=256, ttl=int(config["CONTENT_CACHE_TTL"]))
+    return _resource("content_cache", build)
+
+def get_media_index():
+    def build():
+        from media_index import MediaIndex
+        config = get_config()
+        return MediaIndex(config["MEDIA_INDEX_PATH"], max_distance=config["MEDIA_MATCH_DISTANCE"])
+    return _resource("media_index", build)
+
+def get_wp_mirror():
+    def build():
+        from wp_mirror import WordPressMirror
+        return WordPressMirror(get_config()["WP_MIRROR_PATH"], get_wordpress_client())
+    return _resource("wp_mirror", build)
+
+def get_duplicate_index():
+    """Near-duplicate index over the bodies and titles in the local WordPress mirror.
+
+    Rebuilt on the next call after the mirror is synced, e.g. by `python wp_mirror.py sync`.
+    """
+    def build():
+        from near_duplicates import NearDuplicateIndex
+        return NearDuplicateIndex(get_config()["NEAR_DUPLICATE_PATH"])
+    index = _resource("duplicate_index", build)
+    if index.refresh_if_synced(get_wp_mirror()) and index.synced_at is None:
+        print("Warning: the WordPress mirror was never synced, so nothing is checked for duplicates; "
+              "run `python wp_mirror.py sync`.")
+    return index
+
+def get_artifact_store():
+    def build():
+        from artifact_store import ArtifactStore
+        config = get_config()
+        return ArtifactStore(
+            config["ARTIFACT_STORE_PATH"],
+            max_session_bytes=int(config["ARTIFACT_SESSION_BYTES"]),
+            max_total_bytes=int(config["ARTIFACT_TOTAL_BYTES"]),
+        )
+    return _resource("artifact_store", build)
+
+def get_publish_outbox():
+    def build():
+        from publish_outbox import PublishOutbox
+        config = get_config()
+        return PublishOutbox(config["PUBLISH_OUTBOX_PATH"], meta_key=config["IDEMPOTENCY_META_KEY"])
+    return _resource("publish_outbox", build)
+
+def get_job_manager():
+    """Process-wide background executor shared by every app session."""
+    def build():
+        from jobs import JobManager
+        return JobManager(max_workers=int(get_config()["JOB_WORKERS"]))
+    return _resource("jobs", build)
+
+_LAZY_ATTRIBUTES = {
+    "client": get_openai_client,
+    "wp_client": get_wordpress_client,
+    "content_cache": get_content_cache,
+    "media_index": get_media_index,
+    "artifact_store": get_artifact_store,
+    "wp_mirror": get_wp_mirror,
+    "duplicate_index": get_duplicate_index,
+}
 
+def __getattr__(name):
+    # Backwards-compatible module attributes (main.client, main.WORDPRESS_URL, ...) resolved lazily.
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    if name in _REQUIRED or name in _DEFAULTS:
+        return get_config()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- Async Clients ---
+# One set of pooled HTTP/2 clients per event loop; httpx clients cannot be shared across loops.
+ASYNC_HTTP_LIMITS = dict(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+ASYNC_HTTP_TIMEOUT = dict(timeout=60, connect=10)
+
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_clients():
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        import httpx
+        from openai import AsyncOpenAI
+        config = get_config()
+        limits = httpx.Limits(**ASYNC_HTTP_LIMITS)
+        timeout = httpx.Timeout(**ASYNC_HTTP_TIMEOUT)
+        http_client = httpx.AsyncClient(timeout=timeout, limits=limits, http2=True)
+        # WordPress calls keep the existing verify=False behaviour, so they get their own pool.
+        wordpress_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=limits,
+            http2=True,
+            verify=False,
+            auth=httpx.BasicAuth(config["WORDPRESS_USERNAME"], config["WORDPRESS_PASSWORD"]),
+        )
+        openai_client = AsyncOpenAI(
+            api_key=config["OPENAI_API_KEY"], base_url=config["OPENAI_BASE_URL"], http_client=http_client, max_retries=0
+        )
+        clients = _async_clients[loop] = (openai_client, http_client, wordpress_client)
+    return clients
+
+async def aclose_clients():
+    """Close the async clients bound to the running event loop."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), None)
+    if clients:
+        openai_client, http_client, wordpress_client = clients
+        await http_client.aclose()
+        await wordpress_client.aclose()
+
+# --- Utility Functions ---
 def get_prompt_for_content_type(content_type, topic, keywords=None):
     if content_type == "Case Study":
         return get_case_study_prompt(topic, keywords)
@@ -93,94 +287,325 @@ def get_prompt_for_content_type(content_type, topic, keywords=None):
         raise ValueError(f"Unsupported content type: {content_type}")
 
 # --- Content Generation ---
-def generate_content(topic, content_type="Case Study", keywords=None):
-    try:
-        prompt = get_prompt_for_content_type(content_type, topic, keywords)
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a professional content writer specializing in manufacturing and production scheduling."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
+def _chat_request(topic, content_type, keywords):
+    get_config()  # load settings (including the trace log path) before the first span closes
+    # Static instructions sit in the system message so the provider can cache the prefix.
+    with tracing.span("prompt_build", content_type=content_type):
+        template = get_prompt_template(content_type)
+        tier = get_model_router().tier(content_type)
+        # The router swaps in the model it picks; this one is the tier's first choice.
+        return dict(
+            model=tier.models[0],
+            messages=template.messages(topic, keywords),
+            temperature=tier.temperature,
+            max_tokens=tier.max_tokens
         )
-        raw_text = response.choices[0].message.content
-        title, body = extract_title_and_body(raw_text)
-        return title, body
+
+def _cache_key(content_type, request):
+    # Keyed on the tier (route) rather than the model that answered, so a fallback or hedge
+    # answer is still a hit next time.
+    route = "|".join(get_model_router().tier(content_type).models)
+    return make_cache_key(content_type, dict(request, model=route))
+
+def prompt_hash(topic, content_type="Case Study", keywords=None):
+    """Hash of the rendered request generate_content would send (its content cache key)."""
+    return _cache_key(content_type, _chat_request(topic, content_type, keywords))
+
+def _request_tokens(content_type, topic, keywords, request):
+    # Admission estimate: the whole prompt plus the most the completions (n of them) may use.
+    return get_prompt_template(content_type).estimate_tokens(topic, keywords) + request["max_tokens"] * request.get("n", 1)
+
+def _create_chat(request, tokens, attempt=None, **kwargs):
+    """chat.completions.create under the model's limiter; returns the parsed response.
+
+    attempt (a model_router.Attempt) times only the request itself, not the limiter's waits.
+    """
+    limiter = get_rate_limiter("chat", request["model"])
+    send = lambda: get_openai_client().chat.completions.with_raw_response.create(**request, **kwargs)
+    raw = limiter.call((lambda: attempt.on_wire(send)) if attempt else send, tokens)
+    limiter.observe(raw.headers)
+    response = raw.parse()
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        limiter.settle(tokens, usage.total_tokens)
+    return response
+
+async def _acreate_chat(request, tokens, attempt=None):
+    limiter = get_rate_limiter("chat", request["model"])
+    openai_client, _, _ = _get_async_clients()
+    send = lambda: openai_client.chat.completions.with_raw_response.create(**request)
+    raw = await limiter.acall((lambda: attempt.aon_wire(send)) if attempt else send, tokens)
+    limiter.observe(raw.headers)
+    response = raw.parse()
+    if response.usage is not None:
+        limiter.settle(tokens, response.usage.total_tokens)
+    return response
+
+def _record_usage(span, response):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+def _content_error(e):
+    if "429" in str(e):
+        return "Error: Quota exceeded. Please check your API plan and billing details.", ""
+    return f"Error generating content: {str(e)}", ""
+
+def generate_content(topic, content_type="Case Study", keywords=None, use_cache=True):
+    with tracing.span("generate_content", content_type=content_type) as run:
+        try:
+            request = _chat_request(topic, content_type, keywords)
+            cache_key = _cache_key(content_type, request)
+            cached = get_content_cache().get(cache_key) if use_cache else None
+            run.set(cache="hit" if cached else "miss")
+            if cached:
+                return tuple(cached)
+            tokens = _request_tokens(content_type, topic, keywords, request)
+            with tracing.span("llm", route=content_type) as llm:
+                model, response = get_model_router().run(
+                    content_type, lambda model, attempt: _create_chat(dict(request, model=model), tokens, attempt),
+                    acall=lambda model, attempt: _acreate_chat(dict(request, model=model), tokens, attempt),
+                )
+                llm.set(model=model)
+                _record_usage(llm, response)
+            raw_text = response.choices[0].message.content
+            title, body = extract_title_and_body(raw_text)
+            get_content_cache().set(cache_key, [title, body])
+            run.set(bytes=len(body.encode("utf-8")))
+            return title, body
+        except Exception as e:
+            run.error = str(e)
+            return _content_error(e)
+
+def generate_candidates(topic, content_type="Case Study", keywords=None, n=3, use_cache=True):
+    """Ask for n completions in one request (the prompt is paid once) and rank them locally.
+
+    Returns [{title, body, scores}] best first (see candidate_scoring); a failed request raises
+    with the same message generate_content would return as its title.
+    """
+    from candidate_scoring import rank_candidates
+
+    with tracing.span("generate_candidates", content_type=content_type, n=n) as run:
+        try:
+            request = _chat_request(topic, content_type, keywords)
+            # Always sent: n in the cache key keeps these [[title, body], ...] entries apart from
+            # generate_content's [title, body] ones, even for n=1.
+            request["n"] = n
+            cache_key = _cache_key(content_type, request)
+            cached = get_content_cache().get(cache_key) if use_cache else None
+            run.set(cache="hit" if cached else "miss")
+            if not cached:
+                tokens = _request_tokens(content_type, topic, keywords, request)
+                with tracing.span("llm", route=content_type, n=n) as llm:
+                    model, response = get_model_router().run(
+                        content_type, lambda model, attempt: _create_chat(dict(request, model=model), tokens, attempt),
+                        acall=lambda model, attempt: _acreate_chat(dict(request, model=model), tokens, attempt),
+                    )
+                    llm.set(model=model)
+                    _record_usage(llm, response)
+                cached = [list(extract_title_and_body(choice.message.content or ""))
+                          for choice in sorted(response.choices, key=lambda c: c.index)]
+                get_content_cache().set(cache_key, cached)
+            with tracing.span("rank_candidates", n=len(cached)):
+                return rank_candidates(cached, content_type, keywords)
+        except Exception as e:
+            run.error = str(e)
+            raise Exception(_content_error(e)[0]) from e
+
+def _open_chat_stream(content_type, request, tokens):
+    """Start a streamed completion on the first model of the route that accepts it; returns (attempt, stream)."""
+    from model_router import Attempt
+    # Not hedged: the caller is already showing text from the first stream.
+    router = get_model_router()
+    error = None
+    for model in router.candidates(content_type):
+        attempt = Attempt(model)
+        try:
+            return attempt, _create_chat(dict(request, model=model), tokens, attempt, stream=True)
+        except Exception as e:
+            router.record(model, attempt.elapsed(), ok=False)
+            error = e
+    raise error
+
+def generate_content_stream(topic, content_type="Case Study", keywords=None, use_cache=True):
+    """Yield (title, body, done) snapshots while the completion streams in; the last one has done=True."""
+    # A span cannot stay open across yields (the consumer shares its context), so the LLM
+    # timings are measured here and recorded once the stream ends.
+    started = time.perf_counter()
+    first_token = None
+    try:
+        request = _chat_request(topic, content_type, keywords)
+        cache_key = _cache_key(content_type, request)
+        cached = get_content_cache().get(cache_key) if use_cache else None
+        if cached:
+            tracing.record("generate_content", time.perf_counter() - started, content_type=content_type, cache="hit")
+            yield cached[0], cached[1], True
+            return
+        parser = StreamingContentParser()
+        title = ""
+        llm_started = time.perf_counter()
+        attempt, stream = _open_chat_stream(content_type, request, _request_tokens(content_type, topic, keywords, request))
+        model = attempt.model
+        try:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - llm_started
+                    tracing.record("llm_first_token", first_token, model=model)
+                if parser.feed(delta) or parser.title != title:
+                    title = parser.title
+                    yield parser.title, parser.body, False
+        except Exception:
+            get_model_router().record(model, attempt.elapsed(), ok=False)
+            raise
+        get_model_router().record(model, attempt.elapsed())
+        title, body = parser.finish()
+        from prompts.PromptRegistry import count_tokens
+        tracing.record("llm", time.perf_counter() - llm_started, model=model, route=content_type, stream=True,
+                       completion_tokens=count_tokens(parser.text))
+        get_content_cache().set(cache_key, [title, body])
+        tracing.record("generate_content", time.perf_counter() - started, content_type=content_type, cache="miss",
+                       bytes=len(body.encode("utf-8")))
+        yield title, body, True
     except Exception as e:
-        if "429" in str(e):
-            return "Error: Quota exceeded. Please check your API plan and billing details.", ""
-        return f"Error generating content: {str(e)}", ""
+        tracing.record("generate_content", time.perf_counter() - started, content_type=content_type, error=str(e))
+        title, body = _content_error(e)
+        yield title, body, True
+
+async def agenerate_content(topic, content_type="Case Study", keywords=None, use_cache=True):
+    with tracing.span("generate_content", content_type=content_type) as run:
+        try:
+            request = _chat_request(topic, content_type, keywords)
+            cache_key = _cache_key(content_type, request)
+            cached = get_content_cache().get(cache_key) if use_cache else None
+            run.set(cache="hit" if cached else "miss")
+            if cached:
+                return tuple(cached)
+            tokens = _request_tokens(content_type, topic, keywords, request)
+            with tracing.span("llm", route=content_type) as llm:
+                model, response = await get_model_router().arun(
+                    content_type, lambda model, attempt: _acreate_chat(dict(request, model=model), tokens, attempt)
+                )
+                llm.set(model=model)
+                _record_usage(llm, response)
+            raw_text = response.choices[0].message.content
+            title, body = extract_title_and_body(raw_text)
+            get_content_cache().set(cache_key, [title, body])
+            run.set(bytes=len(body.encode("utf-8")))
+            return title, body
+        except Exception as e:
+            run.error = str(e)
+            return _content_error(e)
 
 # --- Image Generation ---
+def _image_request(prompt, size):
+    return dict(
+        model="dall-e-3",
+        prompt=prompt,
+        size=size,
+        quality="standard",
+        n=1,
+        response_format="b64_json"
+    )
+
+def _create_image(request):
+    limiter = get_rate_limiter("images")
+    raw = limiter.call(lambda: get_openai_client().images.with_raw_response.generate(**request))
+    limiter.observe(raw.headers)
+    return raw.parse()
+
+async def _acreate_image(request):
+    limiter = get_rate_limiter("images")
+    openai_client, _, _ = _get_async_clients()
+    raw = await limiter.acall(lambda: openai_client.images.with_raw_response.generate(**request))
+    limiter.observe(raw.headers)
+    return raw.parse()
+
+def _decode_image(response):
+    # response_format="b64_json": the image arrives inline, so "download" is the base64 decode.
+    with tracing.span("image_decode") as s:
+        image_data = response.data[0].b64_json
+        if not image_data:
+            return None
+        asset = ImageAsset.from_base64(image_data)
+        s.set(bytes=len(asset))
+        return asset
+
 def generate_image(prompt, size="1024x1024"):
-    try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size=size,
-            quality="standard",
-            n=1
-        )
-        image_url = response.data[0].url
-        image_response = requests.get(image_url)
-        if image_response.status_code == 200:
-            image_data = base64.b64encode(image_response.content).decode('utf-8')
-            return image_data
-        else:
+    with tracing.span("generate_image", size=size) as run:
+        try:
+            request = _image_request(prompt, size)
+            with tracing.span("image_generate", model=request["model"]):
+                response = _create_image(request)
+            return _decode_image(response)
+        except Exception as e:
+            run.error = str(e)
+            print(f"Error generating image: {str(e)}")
+            return None
+
+async def agenerate_image(prompt, size="1024x1024"):
+    with tracing.span("generate_image", size=size) as run:
+        try:
+            request = _image_request(prompt, size)
+            with tracing.span("image_generate", model=request["model"]):
+                response = await _acreate_image(request)
+            return _decode_image(response)
+        except Exception as e:
+            run.error = str(e)
+            print(f"Error generating image: {str(e)}")
             return None
-    except Exception as e:
-        print(f"Error generating image: {str(e)}")
-        return None
 
 # --- Upload to WordPress ---
-def upload_to_wordpress(title, body, images=None, content_type="Case Study", template=None, page_template=None, categories=None, meta=None):
+def _post_route(content_type):
     if content_type == "Case Study":
-        API_ENDPOINT = f"{WORDPRESS_URL}/wp-json/wp/v2/use-case"
-    else:
-        API_ENDPOINT = f"{WORDPRESS_URL}/wp-json/wp/v2/posts"
-
-    USERNAME = WORDPRESS_USERNAME
-    APP_PASSWORD = WORDPRESS_PASSWORD
-
-    def upload_image_and_get_id(image_data, filename):
-        media_endpoint = f"{WORDPRESS_URL}/wp-json/wp/v2/media"
-
-        # Decode base64 and resize to 854x480
-        image_binary = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_binary)).convert("RGB")
-        image = image.resize((854, 480))  # 16:9 480p
-
-        # Save resized image to buffer
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        resized_image_binary = buffer.getvalue()
-
-        headers = {
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': 'image/png',
-        }
-
-        resp = requests.post(
-            media_endpoint,
-            data=resized_image_binary,
-            headers=headers,
-            auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
-            verify=False
-        )
-        resp.raise_for_status()
-        return resp.json()['id'], resp.json()['source_url']
+        return "use-case"
+    return "posts"
 
-    featured_media_id = None
-    detail_featured_image_id = None
-    content_image_url = None
+def _prepare_media(image_data, role, presets=None):
+    # Accepts an ImageAsset (or legacy base64 string); resized/encoded per role preset
+    from media_encoder import MEDIA_PRESETS, encode_image
+    preset = (presets or MEDIA_PRESETS)[role]
+    with tracing.span("media_encode", role=role, format=preset.format) as s:
+        image = ImageAsset.coerce(image_data)
+        data, mime_type, extension = encode_image(image, preset)
+        s.set(bytes_in=len(image), bytes=len(data))
+        return data, mime_type, extension
 
+def _media_jobs(images):
+    # images[0] is the featured (display) image, images[1] the content image.
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    jobs = []
     if images:
         if len(images) > 0 and images[0]:
-            featured_media_id, _ = upload_image_and_get_id(images[0], f"display_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+            jobs.append(("featured", images[0], f"display_{timestamp}"))
         if len(images) > 1 and images[1]:
-            detail_featured_image_id, content_image_url = upload_image_and_get_id(images[1], f"content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+            jobs.append(("content", images[1], f"content_{timestamp}"))
+    return jobs
+
+def _validated_media_hit(hit, status_code, resp_json):
+    # Only stale index hits are re-checked against WordPress before being reused.
+    if status_code == 200:
+        get_media_index().mark_verified(hit["sha256"], resp_json.get("source_url"))
+        return {**hit, "source_url": resp_json.get("source_url") or hit["source_url"]}
+    if status_code in (404, 410):
+        get_media_index().forget(hit["media_id"])
+    return None
+
+def _collect_media(roles, results):
+    # A failed upload only drops its own image; the other one is still attached to the post.
+    media = {}
+    for role, result in zip(roles, results):
+        if isinstance(result, BaseException):
+            print(f"Error uploading {role} image: {str(result)}")
+        else:
+            media[role] = result
+    return media
+
+def _build_post_data(title, body, media, categories=None, meta=None, page_template=None):
+    featured_media_id = media["featured"][0] if "featured" in media else None
+    detail_featured_image_id, content_image_url = media.get("content", (None, None))
 
     # Embed second image into body if available
     if content_image_url:
@@ -203,16 +628,174 @@ def upload_to_wordpress(title, body, images=None, content_type="Case Study", tem
         data["meta"] = {**data.get("meta", {}), **meta}
     if page_template:
         data.setdefault("meta", {})["_wp_page_template"] = page_template
+    return data
 
-    response = requests.post(
-        API_ENDPOINT,
-        json=data,
-        auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
-        verify=False
+def upload_media(images, media_presets=None, created=None, strict=False):
+    """Upload (or reuse) the featured and content images; returns {role: (media_id, source_url)}.
+
+    Ids of media actually uploaded (not reused from the media index) are appended to created.
+    A failed upload only drops its own image, unless strict is set: then it is raised.
+    """
+    from media_index import MediaIndex
+    from wordpress import MEDIA_FIELDS
+    wp_client = get_wordpress_client()
+    media_index = get_media_index()
+
+    def upload_image_and_get_id(image_data, role, basename):
+        data, mime_type, extension = _prepare_media(image_data, role, media_presets)
+        sha256, phash = MediaIndex.fingerprint(data)
+        hit = media_index.lookup(sha256, phash, role)
+        if hit and hit["stale"]:
+            try:
+                resp = wp_client.get(f"media/{hit['media_id']}", fields=MEDIA_FIELDS)
+                hit = _validated_media_hit(hit, resp.status_code, resp.json() if resp.status_code == 200 else None)
+            except Exception:
+                hit = None
+        if hit:
+            tracing.record("media_reused", 0.0, role=role, media_id=hit["media_id"])
+            return hit["media_id"], hit["source_url"]
+        with tracing.span("media_upload", role=role, bytes=len(data)):
+            media_id, source_url = wp_client.upload_media(data, f"{basename}.{extension}", mime_type)
+        if created is not None:
+            created.append(media_id)
+        media_index.record(sha256, phash, role, media_id, source_url)
+        return media_id, source_url
+
+    def upload_or_error(job):
+        try:
+            return upload_image_and_get_id(*job)
+        except Exception as e:
+            return e
+
+    # Upload (and transcode) both images concurrently.
+    jobs = _media_jobs(images)
+    results = []
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [pool.submit(tracing.bind(upload_or_error), (image_data, role, basename))
+                       for role, image_data, basename in jobs]
+            results = [future.result() for future in futures]
+    if strict:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    return _collect_media([job[0] for job in jobs], results)
+
+async def aupload_media(images, media_presets=None, created=None, strict=False):
+    """Async upload_media(): HTTP on the loop's WordPress pool, encoding and index bookkeeping in threads."""
+    from media_index import MediaIndex
+    from wordpress import MEDIA_FIELDS, media_headers
+    _, _, wordpress_client = _get_async_clients()
+    wp_client = get_wordpress_client()
+    media_index = get_media_index()
+
+    async def upload_image_and_get_id(image_data, role, basename):
+        # Decode/resize/encode is CPU-bound; keep it off the event loop.
+        data, mime_type, extension = await asyncio.to_thread(_prepare_media, image_data, role, media_presets)
+        sha256, phash = await asyncio.to_thread(MediaIndex.fingerprint, data)
+        hit = await asyncio.to_thread(media_index.lookup, sha256, phash, role)
+        if hit and hit["stale"]:
+            try:
+                resp = await wordpress_client.get(wp_client.url(f"media/{hit['media_id']}"), params={"_fields": MEDIA_FIELDS})
+                hit = _validated_media_hit(hit, resp.status_code, resp.json() if resp.status_code == 200 else None)
+            except Exception:
+                hit = None
+        if hit:
+            tracing.record("media_reused", 0.0, role=role, media_id=hit["media_id"])
+            return hit["media_id"], hit["source_url"]
+        with tracing.span("media_upload", role=role, bytes=len(data)):
+            resp = await wordpress_client.post(
+                wp_client.url("media"),
+                content=data,
+                headers=media_headers(f"{basename}.{extension}", mime_type),
+                params={"_fields": MEDIA_FIELDS}
+            )
+        resp.raise_for_status()
+        resp_json = resp.json()
+        if created is not None:
+            created.append(resp_json['id'])
+        await asyncio.to_thread(media_index.record, sha256, phash, role, resp_json['id'], resp_json['source_url'])
+        return resp_json['id'], resp_json['source_url']
+
+    jobs = _media_jobs(images)
+    results = await asyncio.gather(
+        *(upload_image_and_get_id(image_data, role, basename) for role, image_data, basename in jobs),
+        return_exceptions=True
     )
+    if strict:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    return _collect_media([job[0] for job in jobs], results)
+
+def publish_post(title, body, media=None, content_type="Case Study", page_template=None, categories=None, meta=None):
+    """Create the post with already uploaded media ({role: (media_id, source_url)}); returns (post_id, link, meta)."""
+    data = _build_post_data(title, body, media or {}, categories=categories, meta=meta, page_template=page_template)
+    with tracing.span("post_create", bytes=len(json.dumps(data))):
+        return get_wordpress_client().create_post(_post_route(content_type), data)
 
+async def apublish_post(title, body, media=None, content_type="Case Study", page_template=None, categories=None, meta=None):
+    import httpx
+    from wordpress import POST_FIELDS
+    _, _, wordpress_client = _get_async_clients()
+    data = _build_post_data(title, body, media or {}, categories=categories, meta=meta, page_template=page_template)
+    with tracing.span("post_create", bytes=len(json.dumps(data))):
+        response = await wordpress_client.post(
+            get_wordpress_client().url(_post_route(content_type)),
+            json=data,
+            params={"_fields": POST_FIELDS}
+        )
     if response.status_code in (201, 200):
         resp_json = response.json()
-        return resp_json.get("id"), resp_json.get("link")
-    else:
-        raise Exception(f"Failed to upload post: {response.status_code} {response.text}")
+        return resp_json.get("id"), resp_json.get("link"), resp_json.get("meta") or {}
+    raise httpx.HTTPStatusError(
+        f"Failed to upload post: {response.status_code} {response.text}", request=response.request, response=response
+    )
+
+def find_published_post(title, idempotency_key, content_type="Case Study"):
+    """(post_id, link, meta) of a post created earlier with this outbox key, or None."""
+    return get_wordpress_client().find_post(
+        _post_route(content_type), title, get_config()["IDEMPOTENCY_META_KEY"], idempotency_key
+    )
+
+async def afind_published_post(title, idempotency_key, content_type="Case Study"):
+    from wordpress import find_post_params, matching_post
+    _, _, wordpress_client = _get_async_clients()
+    response = await wordpress_client.get(get_wordpress_client().url(_post_route(content_type)), params=find_post_params(title))
+    response.raise_for_status()
+    return matching_post(response.json(), get_config()["IDEMPOTENCY_META_KEY"], idempotency_key)
+
+def post_exists(post_id, content_type="Case Study"):
+    return get_wordpress_client().post_exists(_post_route(content_type), post_id)
+
+async def apost_exists(post_id, content_type="Case Study"):
+    _, _, wordpress_client = _get_async_clients()
+    response = await wordpress_client.get(
+        get_wordpress_client().url(f"{_post_route(content_type)}/{post_id}"), params={"_fields": "id,status"}
+    )
+    if response.status_code in (404, 410):
+        return False
+    response.raise_for_status()
+    return response.json().get("status") != "trash"
+
+def delete_media(media_id):
+    get_wordpress_client().delete_media(media_id)
+    get_media_index().forget(media_id)
+
+def upload_to_wordpress(title, body, images=None, content_type="Case Study", template=None, page_template=None, categories=None, meta=None, media_presets=None):
+    # Goes through the outbox, so retrying after a timeout never creates a second post.
+    with tracing.span("upload", content_type=content_type):
+        outbox = get_publish_outbox()
+        key = outbox.enqueue(title, body, images, content_type, page_template=page_template, categories=categories, meta=meta)
+        entry = outbox.publish(key, attempts=int(get_config()["PUBLISH_ATTEMPTS"]), media_presets=media_presets)
+        return entry["post_id"], entry["post_url"]
+
+async def aupload_to_wordpress(title, body, images=None, content_type="Case Study", template=None, page_template=None, categories=None, meta=None, media_presets=None):
+    # Same outbox as upload_to_wordpress: its SQLite bookkeeping runs in threads, the HTTP on the loop's pool.
+    with tracing.span("upload", content_type=content_type):
+        outbox = get_publish_outbox()
+        key = await asyncio.to_thread(
+            outbox.enqueue, title, body, images, content_type, page_template=page_template, categories=categories, meta=meta
+        )
+        entry = await outbox.apublish(key, attempts=int(get_config()["PUBLISH_ATTEMPTS"]), media_presets=media_presets)
+        return entry["post_id"], entry["post_url"]
@@ -0,0 +1,109 @@
+import io
+
+from image_asset import ImageAsset
+
+__all__ = ['EncodingPreset', 'MEDIA_PRESETS', 'encode_image', 'resize_image']
+
+# format -> (PIL format name, MIME type, file extension)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "png": ("PNG", "image/png", "png"),
+}
+
+
+class EncodingPreset:
+    """How to encode one media role: output format, quality, target box, resize mode and byte budget."""
+
+    def __init__(self, format="webp", quality=82, size=None, resize="fit", max_bytes=None, min_quality=50):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        if resize not in ("fit", "crop"):
+            raise ValueError(f"Unsupported resize mode: {resize}")
+        self.format = format
+        self.quality = quality
+        self.size = tuple(size) if size else None
+        self.resize = resize
+        self.max_bytes = max_bytes
+        self.min_quality = min_quality
+
+    def replace(self, **changes):
+        params = dict(format=self.format, quality=self.quality, size=self.size, resize=self.resize,
+                      max_bytes=self.max_bytes, min_quality=self.min_quality)
+        params.update(changes)
+        return EncodingPreset(**params)
+
+    def __repr__(self):
+        return (f"EncodingPreset(format={self.format!r}, quality={self.quality}, size={self.size}, "
+                f"resize={self.resize!r}, max_bytes={self.max_bytes})")
+
+
+# Featured images are shown as 16:9 cards, so crop; content images keep their aspect ratio.
+MEDIA_PRESETS = {
+    "featured": EncodingPreset("webp", quality=82, size=(854, 480), resize="crop", max_bytes=150_000),
+    "content": EncodingPreset("webp", quality=82, size=(1280, 720), resize="fit", max_bytes=250_000),
+}
+
+
+def resize_image(image, size, mode="fit"):
+    """Resize without distortion: "fit" scales down into the box, "crop" fills it and trims the overflow."""
+    from PIL import Image
+
+    if not size:
+        return image
+    width, height = image.size
+    target_w, target_h = size
+    if mode == "crop":
+        scale = max(target_w / width, target_h / height)
+        crop_w, crop_h = target_w / scale, target_h / scale
+        left, top = (width - crop_w) / 2, (height - crop_h) / 2
+        return image.resize(size, Image.LANCZOS, box=(left, top, left + crop_w, top + crop_h), reducing_gap=3.0)
+    scale = min(target_w / width, target_h / height)
+    if scale >= 1:
+        return image
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def _save(image, pil_format, quality):
+    buffer = io.BytesIO()
+    if pil_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    elif pil_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def encode_image(image, preset):
+    """Resize and encode an ImageAsset/PIL image per preset; returns (data, mime_type, extension).
+
+    max_bytes is best effort: lossy formats drop quality down to min_quality to fit it.
+    """
+    if not hasattr(image, "mode"):
+        image = ImageAsset.coerce(image).image
+    pil_format, mime_type, extension = FORMATS[preset.format]
+
+    if pil_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if pil_format != "JPEG" and "A" in image.getbands() else "RGB")
+    image = resize_image(image, preset.size, preset.resize)
+
+    data = _save(image, pil_format, preset.quality)
+    if pil_format == "PNG" or not preset.max_bytes or len(data) <= preset.max_bytes:
+        return data, mime_type, extension
+
+    # Binary search for the highest quality that fits the byte budget.
+    best = None
+    low, high = preset.min_quality, preset.quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = _save(image, pil_format, quality)
+        if len(candidate) <= preset.max_bytes:
+            best = candidate
+            low = quality + 1
+        else:
+            high = quality - 1
+    if best is None:
+        best = _save(image, pil_format, preset.min_quality)
+    return best, mime_type, extension
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+__all__ = ['MediaIndex', 'dhash', 'hamming']
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash of a PIL image; near-identical images differ in only a few bits."""
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class MediaIndex:
+    """SQLite index of uploaded media: SHA-256 and perceptual hash -> WordPress media id and source_url."""
+
+    def __init__(self, path, stale_after=7 * 24 * 3600, max_distance=None):
+        # Perceptual matching is opt-in: a dHash only compares brightness gradients, so flat or
+        # low-detail images (solid colours, text on white) collide. None reuses exact bytes only.
+        self.path = path
+        self.stale_after = stale_after
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            "sha256 TEXT PRIMARY KEY, phash INTEGER NOT NULL, role TEXT NOT NULL, "
+            "media_id INTEGER NOT NULL, source_url TEXT NOT NULL, "
+            "created_at REAL NOT NULL, verified_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS media_role_phash ON media (role, phash)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS media_media_id ON media (media_id)")
+        self._db.commit()
+
+    @staticmethod
+    def fingerprint(data):
+        """Return (sha256, phash) for encoded image bytes."""
+        from image_asset import ImageAsset
+
+        asset = ImageAsset(data)
+        # SQLite integers are signed 64-bit.
+        phash = dhash(asset.image) - (1 << 63)
+        return hashlib.sha256(data).hexdigest(), phash
+
+    def lookup(self, sha256, phash, role):
+        """Find an uploaded match: exact bytes, then (if max_distance is set) the closest dHash for the role.
+
+        Returns a dict with media_id, source_url, sha256 and stale, or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, media_id, source_url, verified_at FROM media WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None and self.max_distance is not None:
+                best = None
+                for candidate in self._db.execute(
+                    "SELECT sha256, media_id, source_url, verified_at, phash FROM media WHERE role = ?", (role,)
+                ):
+                    distance = hamming(candidate[4] + (1 << 63), phash + (1 << 63))
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, candidate[:4])
+                row = best[1] if best else None
+        if row is None:
+            return None
+        return {
+            "sha256": row[0],
+            "media_id": row[1],
+            "source_url": row[2],
+            "stale": time.time() - row[3] > self.stale_after,
+        }
+
+    def record(self, sha256, phash, role, media_id, source_url):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (sha256, phash, role, media_id, source_url, created_at, verified_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, phash, role, media_id, source_url, now, now),
+            )
+            self._db.commit()
+
+    def mark_verified(self, sha256, source_url=None):
+        with self._lock:
+            if source_url:
+                self._db.execute(
+                    "UPDATE media SET verified_at = ?, source_url = ? WHERE sha256 = ?",
+                    (time.time(), source_url, sha256),
+                )
+            else:
+                self._db.execute("UPDATE media SET verified_at = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._db.commit()
+
+    def forget(self, media_id):
+        """Drop every entry pointing at a media item that no longer exists on WordPress."""
+        with self._lock:
+            self._db.execute("DELETE FROM media WHERE media_id = ?", (media_id,))
+            self._db.commit()
@@ -0,0 +1,313 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+__all__ = ['ModelRouter', 'ModelTier', 'Attempt', 'DEFAULT_TIERS']
+
+
+class ModelTier:
+    """The models a content type may use, preferred first, and its completion budget."""
+
+    def __init__(self, models, max_tokens=2000, temperature=0.7):
+        self.models = tuple(models)
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    @classmethod
+    def coerce(cls, value):
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls(**value)
+        return cls(value)
+
+    def __repr__(self):
+        return f"ModelTier({self.models!r}, max_tokens={self.max_tokens})"
+
+
+# A case study body is under 250 words, so it gets a small, fast model and a small budget;
+# long blog posts keep a larger model. Override with MODEL_TIERS in the secrets.
+DEFAULT_TIERS = {
+    "Case Study": ModelTier(("gpt-4o-mini", "gpt-4o", "gpt-4"), max_tokens=800),
+    "Blog": ModelTier(("gpt-4o", "gpt-4-turbo", "gpt-4"), max_tokens=2000),
+}
+
+
+class Attempt:
+    """One request to one model. Its clock only runs while the request is on the wire, so the
+    caller's rate-limiter admission and retry sleeps are not counted as model latency."""
+
+    def __init__(self, model, signal_factory=Future):
+        self.model = model
+        self.sent_at = None
+        self.on_air = False
+        self._signal_factory = signal_factory
+        self.signal = signal_factory()  # resolved when the request next goes on the wire
+
+    def _sending(self):
+        self.sent_at = time.perf_counter()
+        self.on_air = True
+        if not self.signal.done():
+            self.signal.set_result(True)
+
+    def _returned(self):
+        self.signal = self._signal_factory()
+        self.on_air = False
+
+    def on_wire(self, send):
+        """Run send() (the actual HTTP request) with the clock running."""
+        self._sending()
+        try:
+            return send()
+        finally:
+            self._returned()
+
+    async def aon_wire(self, send):
+        self._sending()
+        try:
+            return await send()
+        finally:
+            self._returned()
+
+    def elapsed(self):
+        """Seconds since the latest send (0 if it was never sent)."""
+        return time.perf_counter() - self.sent_at if self.sent_at is not None else 0.0
+
+
+class _ModelStats:
+    """Rolling latency and error window of one model."""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+
+    def quantile(self, q):
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    @property
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ModelRouter:
+    """Send each request to the fastest healthy model of its content type's tier.
+
+    A model is unhealthy while its recent error rate is above max_error_rate or for cooldown
+    seconds after error_burst errors in a row; unhealthy models stay at the end of the chain as a
+    last resort. With hedging on, a second request goes to the next model once the first has
+    run past its model's p95 latency (hedge_after until there are min_samples); the first answer
+    wins and the other request is cancelled.
+    """
+
+    def __init__(self, tiers=None, window=50, min_samples=5, max_error_rate=0.5, error_burst=3,
+                 cooldown=60.0, hedge=True, hedge_after=45.0, min_hedge_delay=2.0):
+        self.tiers = {name: ModelTier.coerce(tier) for name, tier in (tiers or DEFAULT_TIERS).items()}
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.error_burst = error_burst
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.min_hedge_delay = min_hedge_delay
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._loop = None
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def tier(self, content_type):
+        if content_type not in self.tiers:
+            raise ValueError(f"No model tier for content type: {content_type}")
+        return self.tiers[content_type]
+
+    def _get_stats(self, model):
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = _ModelStats(self.window)
+        return stats
+
+    # --- Bookkeeping ---
+    def record(self, model, seconds, ok=True):
+        with self._lock:
+            stats = self._get_stats(model)
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies.append(seconds)
+                stats.consecutive_errors = 0
+            else:
+                stats.consecutive_errors += 1
+                if stats.consecutive_errors >= self.error_burst:
+                    stats.down_until = time.monotonic() + self.cooldown
+
+    def _healthy(self, stats, now):
+        if stats.down_until > now:
+            return False
+        return len(stats.outcomes) < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def candidates(self, content_type):
+        """The tier's models in the order to try them: healthy by median latency, then the rest."""
+        models = self.tier(content_type).models
+        now = time.monotonic()
+        with self._lock:
+            stats = {model: self._get_stats(model) for model in models}
+            healthy = [model for model in models if self._healthy(stats[model], now)]
+            known = [stats[model].quantile(0.5) for model in healthy if len(stats[model].latencies) >= self.min_samples]
+            # A model without enough samples ties with the fastest known one, so the tier's own
+            # preference order decides between them (sorted() is stable).
+            untried = min(known, default=0.0)
+
+            def median(model):
+                s = stats[model]
+                return s.quantile(0.5) if len(s.latencies) >= self.min_samples else untried
+            return sorted(healthy, key=median) + [model for model in models if model not in healthy]
+
+    def hedge_delay(self, model):
+        with self._lock:
+            stats = self._get_stats(model)
+            p95 = stats.quantile(0.95) if len(stats.latencies) >= self.min_samples else None
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.hedge_after)
+
+    # --- Calls ---
+    def _count_hedge_win(self, hedged_against, winner):
+        if hedged_against is not None and winner != hedged_against:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def _timed(self, call, attempt):
+        try:
+            result = call(attempt.model, attempt)
+        except Exception:
+            self.record(attempt.model, attempt.elapsed(), ok=False)
+            raise
+        self.record(attempt.model, attempt.elapsed())
+        return attempt.model, result
+
+    def _event_loop(self):
+        """The loop that runs run()'s hedged requests, on one daemon thread per router."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="model-router", daemon=True).start()
+            return self._loop
+
+    def _hedge_due(self, attempt):
+        """(seconds until the hedge is due, signal to wait on instead); only time on the wire counts."""
+        signal = attempt.signal
+        if not attempt.on_air:
+            return None, signal  # waiting for admission or a retry: wake when it is sent
+        return max(0.0, attempt.sent_at + self.hedge_delay(attempt.model) - time.perf_counter()), None
+
+    def run(self, content_type, call, hedge=None, acall=None):
+        """Return (model, call(model, attempt)), falling back along the chain and hedging slow requests.
+
+        call sends through attempt.on_wire(), so rate-limiter admission and retry sleeps count
+        neither towards the model's latency nor towards the hedge delay. Without a hedge to race,
+        the request runs on the caller's thread. Hedging needs acall, the async form of call: a
+        blocking request cannot be interrupted, so the race runs through arun() on the router's
+        event loop, where the losing request is cancelled. Spans opened by acall still nest under
+        the caller's, as the task starts in a copy of the caller's context.
+        """
+        models = self.candidates(content_type)
+        hedge = self.hedge if hedge is None else hedge
+        if not hedge or acall is None or len(models) == 1:
+            return self._run_inline(models, call)
+        return asyncio.run_coroutine_threadsafe(self.arun(content_type, acall, hedge), self._event_loop()).result()
+
+    def _run_inline(self, models, call):
+        error = None
+        for i, model in enumerate(models):
+            if i:
+                with self._lock:
+                    self.fallbacks += 1
+            try:
+                return self._timed(call, Attempt(model))
+            except Exception as e:
+                error = e
+        raise error
+
+    async def arun(self, content_type, call, hedge=None):
+        """Async run(); call(model, attempt) returns an awaitable sent through attempt.aon_wire().
+
+        The losing request is cancelled.
+        """
+        models = self.candidates(content_type)
+        hedge = self.hedge if hedge is None else hedge
+
+        async def timed(attempt):
+            try:
+                result = await call(attempt.model, attempt)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.record(attempt.model, attempt.elapsed(), ok=False)
+                raise
+            self.record(attempt.model, attempt.elapsed())
+            return attempt.model, result
+
+        def start(model):
+            attempt = Attempt(model, signal_factory=asyncio.get_running_loop().create_future)
+            pending[asyncio.ensure_future(timed(attempt))] = attempt
+
+        pending = {}
+        error = hedged_against = None
+        next_model = 0
+        try:
+            while True:
+                if not pending:
+                    if next_model >= len(models):
+                        raise error
+                    if next_model:
+                        with self._lock:
+                            self.fallbacks += 1
+                    start(models[next_model])
+                    next_model += 1
+                timeout = signal = None
+                if hedge and len(pending) == 1 and next_model < len(models):
+                    timeout, signal = self._hedge_due(next(iter(pending.values())))
+                done, _ = await asyncio.wait(list(pending) + ([signal] if signal else []), timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                done = [task for task in done if task in pending]
+                if not done:
+                    if signal is not None or self._hedge_due(next(iter(pending.values())))[0] != 0.0:
+                        continue
+                    hedged_against = next(iter(pending.values())).model
+                    with self._lock:
+                        self.hedges += 1
+                    start(models[next_model])
+                    next_model += 1
+                    continue
+                for task in done:
+                    del pending[task]
+                    try:
+                        model, result = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self._count_hedge_win(hedged_against, model)
+                    return model, result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            models = {
+                model: {
+                    "requests": len(s.outcomes),
+                    "error_rate": round(s.error_rate, 3),
+                    "p50_s": s.quantile(0.5),
+                    "p95_s": s.quantile(0.95),
+                    "down": s.down_until > time.monotonic(),
+                }
+                for model, s in self._stats.items()
+            }
+            return {"hedges": self.hedges, "hedge_wins": self.hedge_wins, "fallbacks": self.fallbacks, "models": models}
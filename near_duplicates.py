@@ -0,0 +1,208 @@
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+__all__ = ['NearDuplicateIndex', 'MinHasher', 'LSHIndex', 'word_shingles', 'char_shingles']
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_MULT = np.uint64(1000003)
+_CHUNK = 2048
+
+
+# --- Shingling ---
+def _hash_tokens(tokens):
+    return np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def word_shingles(text, k=5):
+    """Unique 32-bit hashes of every run of k consecutive words (fewer for very short texts)."""
+    ids = _hash_tokens(_WORD_RE.findall(text.lower()))
+    if not len(ids):
+        return ids
+    k = min(k, len(ids))
+    count = len(ids) - k + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(k):
+            hashes = hashes * _SHINGLE_MULT + ids[offset:offset + count]
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & _MAX_HASH)
+
+
+def char_shingles(text, k=4):
+    """Unique 32-bit hashes of the character k-grams of the lowercased words; for short texts like titles."""
+    normalized = " ".join(_WORD_RE.findall(text.lower()))
+    if len(normalized) <= k:
+        return _hash_tokens([normalized] if normalized else [])
+    return np.unique(_hash_tokens([normalized[i:i + k] for i in range(len(normalized) - k + 1)]))
+
+
+# --- MinHash / LSH ---
+class MinHasher:
+    """num_perm universal hash permutations, evaluated for all shingles at once."""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # a, b < 2**32 and shingles < 2**32 keep a * x + b inside uint64.
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, shingles):
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(shingles), _CHUNK):
+            chunk = shingles[start:start + _CHUNK][None, :]
+            hashed = ((self.a * chunk + self.b) % _MERSENNE) & _MAX_HASH
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures: only items sharing a band bucket are ever compared."""
+
+    def __init__(self, num_perm=128, bands=32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.keys = []
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _band_keys(self, signature):
+        return [signature[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def add(self, key, signature):
+        position = len(self.keys)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        self._matrix = None
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(position)
+
+    def query(self, signature, threshold):
+        """Return [(key, estimated_jaccard)] at or above threshold, most similar first."""
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        if not candidates:
+            return []
+        if self._matrix is None:
+            self._matrix = np.vstack(self._signatures)
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._matrix[positions] == signature).mean(axis=1)
+        order = np.argsort(-similarity)
+        return [
+            (self.keys[positions[i]], float(similarity[i]))
+            for i in order if similarity[i] >= threshold
+        ]
+
+
+# --- Index over published content ---
+class NearDuplicateIndex:
+    """MinHash/LSH index over existing posts: word shingles of bodies, character shingles of titles.
+
+    Body signatures are cached in an .npz file keyed by content hash, so a rebuild only
+    hashes posts that are new or changed.
+    """
+
+    def __init__(self, path=None, num_perm=128, bands=32, body_threshold=0.7, topic_threshold=0.6):
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.body_threshold = body_threshold
+        self.topic_threshold = topic_threshold
+        self._hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._items = {}
+        self._bodies = LSHIndex(num_perm, bands)
+        self._titles = LSHIndex(num_perm, bands)
+        self.built = False
+        self.synced_at = None  # the mirror's last_synced() as of the latest refresh()
+
+    def _load_cached(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with np.load(self.path) as cached:
+            if cached["signatures"].shape[1:] != (self.num_perm,):
+                return {}
+            return dict(zip(cached["content_hashes"].tolist(), cached["signatures"]))
+
+    def _save(self, signatures):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        hashes = list(signatures)
+        matrix = np.vstack([signatures[h] for h in hashes]) if hashes else np.empty((0, self.num_perm), np.uint64)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, content_hashes=np.array(hashes, dtype=str), signatures=matrix)
+        os.replace(tmp_path, self.path)
+
+    def build(self, documents):
+        """Index (route, id, title, content_hash, body_text) rows; returns how many bodies were hashed."""
+        cached = self._load_cached()
+        signatures, hashed = {}, 0
+        items, bodies, titles = {}, LSHIndex(self.num_perm, self.bands), LSHIndex(self.num_perm, self.bands)
+        for route, item_id, title, content_hash, body_text in documents:
+            key = (route, item_id)
+            items[key] = title
+            if body_text:
+                signature = cached.get(content_hash)
+                if signature is None:
+                    signature = self._hasher.signature(word_shingles(body_text))
+                    hashed += 1
+                signatures[content_hash] = signature
+                bodies.add(key, signature)
+            if title:
+                titles.add(key, self._hasher.signature(char_shingles(title)))
+        with self._lock:
+            self._items, self._bodies, self._titles = items, bodies, titles
+        if self.path and (hashed or len(signatures) != len(cached)):
+            self._save(signatures)
+        return hashed
+
+    def refresh(self, mirror, routes=None):
+        """Rebuild from a WordPressMirror's stored bodies (run `python wp_mirror.py sync` to update it)."""
+        synced_at = mirror.last_synced()
+        hashed = self.build(mirror.iter_bodies(routes))
+        self.synced_at, self.built = synced_at, True
+        return hashed
+
+    def refresh_if_synced(self, mirror, routes=None):
+        """refresh() unless nothing was synced since the last one; returns whether it rebuilt."""
+        with self._refresh_lock:
+            if self.built and mirror.last_synced() == self.synced_at:
+                return False
+            self.refresh(mirror, routes)
+            return True
+
+    def _matches(self, lsh, signature, threshold):
+        with self._lock:
+            found = lsh.query(signature, threshold)
+            return [
+                {"route": route, "id": item_id, "title": self._items.get((route, item_id), ""), "similarity": round(sim, 3)}
+                for (route, item_id), sim in found
+            ]
+
+    def check_topic(self, topic, threshold=None):
+        """Existing items whose title is close to a topic; cheap enough to run before any LLM call."""
+        signature = self._hasher.signature(char_shingles(topic))
+        return self._matches(self._titles, signature, threshold or self.topic_threshold)
+
+    def check_draft(self, body, threshold=None):
+        """Existing items whose body is a near-duplicate of a generated draft."""
+        signature = self._hasher.signature(word_shingles(body))
+        return self._matches(self._bodies, signature, threshold or self.body_threshold)
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "bodies": len(self._bodies), "titles": len(self._titles)}
@@ -1,6 +1,10 @@
 # This file will be moved to prompts/BlogPrompt.py
 def get_blog_prompt(topic, keywords=None):
     """Get the blog prompt template with topic and optional keywords."""
+    return get_blog_request(topic, keywords) + BLOG_INSTRUCTIONS
+
+def get_blog_request(topic, keywords=None):
+    """Get the variable part of the blog prompt: topic and optional keywords."""
     # Base prompt with topic
     base_prompt = f"Write a professional blog post about: {topic}\n\n"
     
@@ -9,8 +13,10 @@ def get_blog_prompt(topic, keywords=None):
     if keywords and keywords.strip():
         keyword_instruction = f"\nIMPORTANT: You MUST naturally incorporate the following keywords in the content: {keywords}\n"
     
-    # Combine with the detailed prompt template
-    return base_prompt + keyword_instruction + """You are a blog writer with an experienced consultant tone, acting as a practical problem-solver who is honest and balanced. Your writing should be use case-driven, exhibit conversational authority, and be experience-backed, naturally referencing "our experience working with manufacturing companies."
+    return base_prompt + keyword_instruction
+
+# Static instructions, identical for every blog post (sent as a cacheable prompt prefix)
+BLOG_INSTRUCTIONS = """You are a blog writer with an experienced consultant tone, acting as a practical problem-solver who is honest and balanced. Your writing should be use case-driven, exhibit conversational authority, and be experience-backed, naturally referencing "our experience working with manufacturing companies."
 
 Target Audience
 
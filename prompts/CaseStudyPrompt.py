@@ -1,6 +1,10 @@
 # This file will be moved to prompts/CaseStudyPrompt.py
 def get_case_study_prompt(topic, keywords=None):
     """Get the case study prompt template with topic and optional keywords."""
+    return get_case_study_request(topic, keywords) + CASE_STUDY_INSTRUCTIONS
+
+def get_case_study_request(topic, keywords=None):
+    """Get the variable part of the case study prompt: topic and optional keywords."""
     # Base prompt with topic
     base_prompt = f"""generate a case study title and body for sfHawk about: {topic}
 The case study body should be less than 250 words."""
@@ -10,8 +14,10 @@ The case study body should be less than 250 words."""
     if keywords and keywords.strip():
         keyword_instruction = f"\nIMPORTANT: You MUST naturally incorporate these keywords in the content: {keywords}\nMake sure to use these keywords in appropriate sections without forcing them.\n"
     
-    # Combine with the detailed prompt template
-    return base_prompt + keyword_instruction + """You are a case study writer. Follow the instructions to create professional case studies targeted at factory owners and manufacturing decision-makers. The case studies should use a formal yet accessible tone that subtly emphasizes the value and innovation that sfHawk brings to manufacturing operations.
+    return base_prompt + keyword_instruction
+
+# Static instructions, identical for every case study (sent as a cacheable prompt prefix)
+CASE_STUDY_INSTRUCTIONS = """You are a case study writer. Follow the instructions to create professional case studies targeted at factory owners and manufacturing decision-makers. The case studies should use a formal yet accessible tone that subtly emphasizes the value and innovation that sfHawk brings to manufacturing operations.
 
 ✨ Required Structure:
 Title Section
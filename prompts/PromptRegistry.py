@@ -0,0 +1,76 @@
+import hashlib
+import threading
+
+from prompts.BlogPrompt import BLOG_INSTRUCTIONS, get_blog_request
+from prompts.CaseStudyPrompt import CASE_STUDY_INSTRUCTIONS, get_case_study_request
+
+SYSTEM_PROMPT = "You are a professional content writer specializing in manufacturing and production scheduling."
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def count_tokens(text):
+    """Count tokens with tiktoken (cl100k_base); falls back to a ~4 chars/token estimate when unavailable."""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+class PromptTemplate:
+    """A versioned prompt: a static system prefix (built once) plus a short per-request suffix."""
+
+    def __init__(self, content_type, version, instructions, build_request):
+        self.content_type = content_type
+        self.version = version
+        self.system = f"{SYSTEM_PROMPT}\n\n{instructions}"
+        self.build_request = build_request
+        self.fingerprint = hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+        self._token_count = None
+
+    @property
+    def token_count(self):
+        """Measured token count of the static prefix."""
+        if self._token_count is None:
+            self._token_count = count_tokens(self.system)
+        return self._token_count
+
+    def messages(self, topic, keywords=None):
+        # The static prefix goes first and never changes, so providers can reuse their prompt cache;
+        # only the short user message varies per request.
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.build_request(topic, keywords)},
+        ]
+
+    def estimate_tokens(self, topic, keywords=None):
+        """Prompt tokens for one request: the cached prefix count plus the suffix."""
+        return self.token_count + count_tokens(self.build_request(topic, keywords))
+
+    def __repr__(self):
+        return f"PromptTemplate({self.content_type!r}, version={self.version!r}, tokens={self.token_count})"
+
+_registry = {}
+
+def register_template(content_type, version, instructions, build_request):
+    _registry[content_type] = PromptTemplate(content_type, version, instructions, build_request)
+    return _registry[content_type]
+
+def get_prompt_template(content_type):
+    template = _registry.get(content_type)
+    if template is None:
+        raise ValueError(f"Unsupported content type: {content_type}")
+    return template
+
+def list_prompt_templates():
+    return list(_registry.values())
+
+# Bump the version whenever the instructions change.
+register_template("Case Study", 1, CASE_STUDY_INSTRUCTIONS, get_case_study_request)
+register_template("Blog", 1, BLOG_INSTRUCTIONS, get_blog_request)
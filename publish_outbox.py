@@ -0,0 +1,494 @@
+"""Local outbox that makes publishing to WordPress safe to retry.
+
+Every post is queued under an idempotency key derived from its content and images, and the key is
+written to the post's meta. Before creating a post the outbox looks for one already carrying the
+key, so a retry after a timeout finds the first post instead of creating a second one. Media ids
+are saved as soon as each upload finishes (a retry does not upload them again), and media the
+outbox uploaded is deleted again if the post is finally given up on.
+
+    python publish_outbox.py list                 # queued and failed posts
+    python publish_outbox.py dispatch --workers 4 # publish everything that is due
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+__all__ = ['PublishOutbox', 'idempotency_key', 'is_retryable', 'PENDING', 'PUBLISHING', 'PUBLISHED', 'FAILED']
+
+PENDING = "pending"
+PUBLISHING = "publishing"
+PUBLISHED = "published"
+FAILED = "failed"
+
+IMAGE_ROLES = ("featured", "content")
+RETRY_STATUSES = (408, 409, 425, 429)
+
+_COLUMNS = (
+    "key", "content_type", "title", "body", "images", "options", "status", "attempts", "next_attempt_at",
+    "media", "created_media", "post_sent_at", "post_id", "post_url", "error", "created_at", "updated_at",
+    "claimed_at", "claimed_by",
+)
+_JSON_COLUMNS = ("images", "options", "media", "created_media")
+
+
+def idempotency_key(content_type, title, body, image_digests=None, categories=None, meta=None, page_template=None):
+    """Hash of everything that ends up in the post: the same content always maps to the same key."""
+    payload = json.dumps(
+        {"content_type": content_type, "title": title, "body": body, "images": image_digests or {},
+         "categories": categories or [], "meta": meta or {}, "page_template": page_template},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def is_retryable(error):
+    """Timeouts, connection errors, 408/409/425/429 and 5xx; other 4xx mean WordPress rejected the post."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUSES or status >= 500
+    import httpx  # the async path (apublish) raises httpx errors
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+
+class PublishOutbox:
+    """SQLite queue of posts to publish; each entry is its media uploads plus the post, as one unit.
+
+    A process publishing an entry holds a lease on it (claimed_at, claimed_by) and renews it before
+    every attempt. Another process (the app, batch.py, the dispatch CLI) only takes the entry over
+    once the lease is older than lease_timeout, i.e. when its holder has died.
+    """
+
+    def __init__(self, path, meta_key="content_pipeline_key", max_attempts=8, base_delay=1.0, max_delay=300.0,
+                 lease_timeout=900.0):
+        self.path = path
+        self.meta_key = meta_key
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Longer than one attempt plus the longest backoff sleep, so a live holder never loses its lease.
+        self.lease_timeout = max(lease_timeout, 2 * max_delay)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.image_dir = os.path.splitext(path)[0] + ".images"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(self.image_dir, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "key TEXT PRIMARY KEY, content_type TEXT NOT NULL, title TEXT NOT NULL, body TEXT NOT NULL, "
+            "images TEXT NOT NULL, options TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "next_attempt_at REAL NOT NULL, media TEXT NOT NULL, created_media TEXT NOT NULL, post_sent_at REAL, "
+            "post_id INTEGER, post_url TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "claimed_at REAL, claimed_by TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column in ("claimed_at REAL", "claimed_by TEXT"):
+            if column.split()[0] not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self._db.commit()
+
+    # --- Images ---
+    def _image_path(self, digest):
+        return os.path.join(self.image_dir, digest)
+
+    def _load_image(self, digest):
+        from image_asset import ImageAsset
+
+        with open(self._image_path(digest), "rb") as f:
+            return ImageAsset(f.read())
+
+    def _drop_images(self, entry):
+        """Delete an entry's image files once it is published or given up on, unless a queued entry shares them."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT images FROM outbox WHERE key != ? AND status IN (?, ?)", (entry["key"], PENDING, PUBLISHING)
+            ).fetchall()
+            shared = {digest for (images,) in rows for digest in json.loads(images).values()}
+            for digest in set(entry["images"].values()) - shared:
+                try:
+                    os.remove(self._image_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    # --- Queue ---
+    def enqueue(self, title, body, images=None, content_type="Case Study", page_template=None, categories=None, meta=None):
+        """Queue a post (images[0] featured, images[1] content) and return its idempotency key.
+
+        Queueing the same content again returns the existing entry; a failed one is queued again.
+        """
+        from image_asset import ImageAsset
+
+        images = list(images or [])
+        assets = {role: ImageAsset.coerce(image) for role, image in zip(IMAGE_ROLES, images) if image}
+        digests = {role: asset.digest for role, asset in assets.items()}
+        key = idempotency_key(content_type, title, body, digests, categories, meta, page_template)
+        options = {"page_template": page_template, "categories": categories, "meta": meta}
+        now = time.time()
+        with self._lock:
+            # Written under the lock, so _drop_images cannot remove a file between here and the insert.
+            for asset in assets.values():
+                asset.save(self.image_dir)
+            self._db.execute(
+                "INSERT OR IGNORE INTO outbox (key, content_type, title, body, images, options, status, attempts, "
+                "next_attempt_at, media, created_media, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, '{}', '[]', ?, ?)",
+                (key, content_type, title, body, json.dumps(digests), json.dumps(options, default=str),
+                 PENDING, now, now, now),
+            )
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, error = NULL, updated_at = ? "
+                "WHERE key = ? AND status = ?",
+                (PENDING, now, now, key, FAILED),
+            )
+            self._db.commit()
+        return key
+
+    def entry(self, key):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM outbox WHERE key = ?", (key,)).fetchone()
+        return self._to_entry(row) if row else None
+
+    def _to_entry(self, row):
+        entry = dict(zip(_COLUMNS, row))
+        for column in _JSON_COLUMNS:
+            entry[column] = json.loads(entry[column])
+        return entry
+
+    def _update(self, key, **fields):
+        fields["updated_at"] = time.time()
+        for column in _JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE outbox SET {assignments} WHERE key = ?", (*fields.values(), key))
+            self._db.commit()
+
+    def _claim(self, key):
+        """Take the lease on a pending entry, or on one whose holder stopped renewing it."""
+        now = time.time()
+        with self._lock:
+            # An expired claim is safe to take over: the key lookup finds a post its holder may
+            # already have created.
+            cursor = self._db.execute(
+                "UPDATE outbox SET status = ?, claimed_at = ?, claimed_by = ?, updated_at = ? "
+                "WHERE key = ? AND (status = ? OR (status = ? AND COALESCE(claimed_at, 0) < ?))",
+                (PUBLISHING, now, self.owner, now, key, PENDING, PUBLISHING, now - self.lease_timeout),
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def _renew(self, key):
+        self._update(key, claimed_at=time.time())
+
+    def _release(self, key, status, **fields):
+        self._update(key, status=status, claimed_at=None, claimed_by=None, **fields)
+
+    def due(self, limit=100):
+        """Keys of pending entries whose next attempt is due and of expired claims, oldest first."""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key FROM outbox WHERE (status = ? AND next_attempt_at <= ?) "
+                "OR (status = ? AND COALESCE(claimed_at, 0) < ?) ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, now, PUBLISHING, now - self.lease_timeout, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def entries(self, statuses=(PENDING, PUBLISHING, FAILED)):
+        marks = ", ".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM outbox WHERE status IN ({marks}) ORDER BY created_at", tuple(statuses)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    # --- Publishing ---
+    def _backoff(self, attempts):
+        return random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** attempts)
+
+    def _post_args(self, entry, media):
+        options = entry["options"]
+        return (entry["title"], entry["body"], media, entry["content_type"]), dict(
+            page_template=options["page_template"], categories=options["categories"],
+            meta={**(options["meta"] or {}), self.meta_key: entry["key"]},
+        )
+
+    def _missing_images(self, entry, media):
+        """Images still to upload, in upload_media's [featured, content] order (None where done)."""
+        missing = [role for role in entry["images"] if role not in media]
+        if not missing:
+            return None
+        return [self._load_image(entry["images"][role]) if role in missing else None for role in IMAGE_ROLES]
+
+    def _attempt(self, entry, media_presets=None):
+        """One pass over the unit: find an earlier post, upload missing media, create the post."""
+        import main
+
+        key = entry["key"]
+        if entry["post_sent_at"]:
+            # An earlier POST may have created the post even though no answer came back.
+            found = main.find_published_post(entry["title"], key, entry["content_type"])
+            if found:
+                return found
+        media = {role: tuple(value) for role, value in entry["media"].items()}
+        images = self._missing_images(entry, media)
+        if images:
+            created = []
+            try:
+                uploaded = main.upload_media(images, media_presets, created=created, strict=True)
+            finally:
+                # Kept even when the other upload failed: these are what compensation deletes.
+                entry["created_media"] += created
+                self._update(key, created_media=entry["created_media"])
+            media.update(uploaded)
+            self._update(key, media=media)
+        self._update(key, post_sent_at=time.time())
+        args, kwargs = self._post_args(entry, media)
+        return main.publish_post(*args, **kwargs)
+
+    async def _aattempt(self, entry, media_presets=None):
+        """Async _attempt()."""
+        import main
+
+        key = entry["key"]
+        if entry["post_sent_at"]:
+            found = await main.afind_published_post(entry["title"], key, entry["content_type"])
+            if found:
+                return found
+        media = {role: tuple(value) for role, value in entry["media"].items()}
+        images = await asyncio.to_thread(self._missing_images, entry, media)
+        if images:
+            created = []
+            try:
+                uploaded = await main.aupload_media(images, media_presets, created=created, strict=True)
+            finally:
+                entry["created_media"] += created
+                await asyncio.to_thread(self._update, key, created_media=entry["created_media"])
+            media.update(uploaded)
+            await asyncio.to_thread(self._update, key, media=media)
+        await asyncio.to_thread(self._update, key, post_sent_at=time.time())
+        args, kwargs = self._post_args(entry, media)
+        return await main.apublish_post(*args, **kwargs)
+
+    def _forget_media(self, entry):
+        """Take this entry's uploads out of the media index once an attempt fails.
+
+        Until the post exists they may still be deleted by _compensate, so no other post should
+        pick them up as reusable.
+        """
+        import main
+
+        for media_id in entry["created_media"]:
+            main.get_media_index().forget(media_id)
+
+    def _media_in_use(self, key):
+        """Media ids referenced by any other entry that is published or may still be."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT media FROM outbox WHERE key != ? AND status != ?", (key, FAILED)
+            ).fetchall()
+        return {value[0] for (media,) in rows for value in json.loads(media).values()}
+
+    def _compensate(self, entry):
+        """Delete the media this entry uploaded; called when the post is given up on.
+
+        Media another entry reused (before the failure took it out of the index) is left alone.
+        """
+        import main
+
+        in_use = self._media_in_use(entry["key"])
+        remaining = list(entry["created_media"])
+        for media_id in entry["created_media"]:
+            if media_id in in_use:
+                continue
+            try:
+                main.delete_media(media_id)
+                remaining.remove(media_id)
+            except Exception as e:
+                print(f"Error deleting orphaned media {media_id}: {str(e)}")
+        deleted = set(entry["created_media"]) - set(remaining)
+        media = {role: value for role, value in entry["media"].items() if value[0] not in deleted}
+        self._update(entry["key"], created_media=remaining, media=media)
+
+    def _start(self, key, gone=False):
+        """Claim an entry for publishing; returns it if it is already published, else None.
+
+        gone=True queues a published entry again because its post was deleted on the site; the
+        media it used may have gone with it, so everything is uploaded afresh.
+        """
+        entry = self.entry(key)
+        if entry is None:
+            raise KeyError(f"No outbox entry {key}")
+        if entry["status"] == PUBLISHED:
+            if not gone:
+                return entry
+            self._update(key, status=PENDING, attempts=0, media={}, created_media=[], post_sent_at=None,
+                         post_id=None, post_url=None, error=None)
+        if not self._claim(key):
+            raise Exception(f"Post {key} is already being published")
+        return None
+
+    def _next_attempt(self, key):
+        self._renew(key)
+        return self.entry(key)
+
+    def _failed(self, key, entry, error, last):
+        """Record a failed attempt and return the delay before the next one.
+
+        Raises when the entry is given up on (marked failed, media deleted) or when this was the
+        caller's last attempt (left pending for dispatch()).
+        """
+        self._forget_media(self.entry(key))
+        total = entry["attempts"] + 1
+        if not is_retryable(error) or total >= self.max_attempts:
+            self._release(key, FAILED, attempts=total, error=str(error))
+            self._compensate(self.entry(key))
+            self._drop_images(self.entry(key))
+            raise error
+        delay = self._backoff(total)
+        self._update(key, attempts=total, error=str(error), next_attempt_at=time.time() + delay)
+        if last:
+            self._release(key, PENDING)
+            raise Exception(f"{error} (queued for retry in {delay:.0f}s)") from error
+        return delay
+
+    def _published(self, key, post_id, post_url, meta):
+        error = None
+        if meta.get(self.meta_key) != key:
+            # Without the key on the post, a retry after a lost response cannot find it and posts twice.
+            error = (f"Post {post_id} was created but WordPress did not save its '{self.meta_key}' meta; "
+                     f"register it with show_in_rest, or retried uploads may be published twice.")
+            print(f"Warning: {error}")
+        self._release(key, PUBLISHED, post_id=post_id, post_url=post_url, error=error)
+        entry = self.entry(key)
+        self._drop_images(entry)
+        return entry
+
+    def publish(self, key, attempts=1, media_presets=None):
+        """Publish a queued entry now, retrying up to attempts times; returns the entry.
+
+        Raises once the attempts are used up. A retryable failure stays queued for dispatch();
+        any other failure (or max_attempts in total) marks the entry failed and deletes its media.
+        media_presets only applies to this call; dispatch() encodes with the default presets.
+        """
+        import main
+
+        done = self._start(key)
+        if done:
+            if main.post_exists(done["post_id"], done["content_type"]):
+                self._drop_images(done)
+                return done
+            self._start(key, gone=True)
+        for attempt in range(attempts):
+            entry = self._next_attempt(key)
+            try:
+                post_id, post_url, meta = self._attempt(entry, media_presets)
+            except Exception as e:
+                time.sleep(self._failed(key, entry, e, last=attempt + 1 >= attempts))
+                continue
+            return self._published(key, post_id, post_url, meta)
+
+    async def apublish(self, key, attempts=1, media_presets=None):
+        """Async publish(): uploads and the post go over the event loop's pool, SQLite runs in threads."""
+        import main
+
+        done = await asyncio.to_thread(self._start, key)
+        if done:
+            if await main.apost_exists(done["post_id"], done["content_type"]):
+                await asyncio.to_thread(self._drop_images, done)
+                return done
+            await asyncio.to_thread(self._start, key, True)
+        for attempt in range(attempts):
+            entry = await asyncio.to_thread(self._next_attempt, key)
+            try:
+                post_id, post_url, meta = await self._aattempt(entry, media_presets)
+            except Exception as e:
+                await asyncio.sleep(await asyncio.to_thread(self._failed, key, entry, e, attempt + 1 >= attempts))
+                continue
+            return await asyncio.to_thread(self._published, key, post_id, post_url, meta)
+
+    def dispatch(self, workers=4, wait=False, attempts=1):
+        """Publish every due entry with at most workers at a time; with wait, keep going until none is pending.
+
+        Returns {"published": n, "failed": n, "retrying": n}.
+        """
+        counts = {PUBLISHED: 0, FAILED: 0, "retrying": 0}
+
+        def run(key):
+            try:
+                self.publish(key, attempts)
+                return PUBLISHED
+            except Exception as e:
+                entry = self.entry(key)
+                print(f"Error publishing {key}: {str(e)}")
+                return entry["status"] if entry and entry["status"] == FAILED else "retrying"
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as pool:
+            while True:
+                keys = self.due(limit=workers * 4)
+                if keys:
+                    for status in pool.map(run, keys):
+                        counts[status] += 1
+                    continue
+                if not wait:
+                    return counts
+                with self._lock:
+                    row = self._db.execute(
+                        "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,)
+                    ).fetchone()
+                if row[0] is None:
+                    return counts
+                time.sleep(max(0.0, min(self.max_delay, row[0] - time.time())))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def run_cli(argv=None):
+    import main
+
+    parser = argparse.ArgumentParser(description="Inspect and drain the WordPress publish outbox.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show queued, in-flight and failed posts")
+    dispatch = commands.add_parser("dispatch", help="publish every due post")
+    dispatch.add_argument("-w", "--workers", type=int, default=4, help="posts published at once")
+    dispatch.add_argument("--wait", action="store_true", help="keep retrying until nothing is pending")
+    args = parser.parse_args(argv)
+
+    outbox = main.get_publish_outbox()
+    if args.command == "list":
+        for entry in outbox.entries():
+            print(f"{entry['key']}  {entry['status']:<10} attempts={entry['attempts']}  {entry['title'][:50]}"
+                  + (f"  error={entry['error'][:80]}" if entry["error"] else ""))
+        print(outbox.stats())
+        return 0
+    counts = outbox.dispatch(workers=args.workers, wait=args.wait)
+    print(", ".join(f"{k}={v}" for k, v in counts.items()))
+    return 0 if not counts[FAILED] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
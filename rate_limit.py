@@ -0,0 +1,209 @@
+import asyncio
+import random
+import re
+import threading
+import time
+
+__all__ = ['RateLimiter', 'TokenBucket', 'parse_reset', 'is_retryable']
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Raised by the OpenAI SDK without a status code when the request never got an answer.
+RETRY_ERRORS = ("APIConnectionError", "APITimeoutError")
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value):
+    """Seconds in an x-ratelimit-reset-* header ("20ms", "1s", "6m0s"), or None."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+
+def _status(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _headers(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or {}
+
+
+def is_retryable(error):
+    """429s (except an exhausted quota), 5xx and connection errors are worth retrying."""
+    if "insufficient_quota" in str(error):
+        return False
+    return _status(error) in RETRY_STATUSES or type(error).__name__ in RETRY_ERRORS
+
+
+class TokenBucket:
+    """capacity units that refill continuously over period seconds; the balance may go negative
+    to reserve capacity for a caller that is already waiting."""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount now and return how long the caller must wait before using it."""
+        self._refill(now)
+        amount = min(float(amount), self.capacity)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount, now):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def clamp(self, remaining, now):
+        """Trust the server's remaining count when it is lower than ours."""
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    """Client-side requests/minute and tokens/minute limiter shared by threads and async tasks.
+
+    Calls are admitted on their estimated tokens (prompt plus max completion); 429s pause every
+    caller for the server's Retry-After / x-ratelimit-reset-* time, then retry with jittered
+    exponential backoff.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._paused_until = 0.0
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.admitted = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    # --- Admission ---
+    def reserve(self, tokens=0):
+        """Reserve one request and tokens; returns the seconds to wait before sending it."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._paused_until - now)
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            self.admitted += 1
+            self.throttled_seconds += wait
+        return wait
+
+    def acquire(self, tokens=0):
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=0):
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated, actual):
+        """Return over-estimated tokens once the response reports its real usage."""
+        if self._tokens and actual is not None and actual < estimated:
+            with self._lock:
+                self._tokens.refund(estimated - actual, time.monotonic())
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    # --- Server feedback ---
+    def observe(self, headers):
+        """Sync with the x-ratelimit-* headers of a response."""
+        if not headers:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                if bucket:
+                    bucket.clamp(float(remaining), now)
+                if float(remaining) <= 0:
+                    reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if reset:
+                        self._paused_until = max(self._paused_until, now + reset)
+
+    def backoff_delay(self, attempt, error=None):
+        """Server-advised delay when there is one, else full-jitter exponential backoff."""
+        headers = _headers(error)
+        advised = None
+        if headers.get("retry-after-ms"):
+            advised = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            advised = parse_reset(headers["retry-after"])
+        if advised is None and _status(error) == 429:
+            advised = max(filter(None, (parse_reset(headers.get("x-ratelimit-reset-requests")),
+                                        parse_reset(headers.get("x-ratelimit-reset-tokens")))), default=None)
+        if advised is not None:
+            # A little jitter on top so waiting callers do not all come back at once.
+            return min(self.max_delay, advised) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _on_error(self, error, attempt):
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+        delay = self.backoff_delay(attempt, error)
+        if _status(error) == 429:
+            self.pause(delay)
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    # --- Calls ---
+    def call(self, fn, tokens=0):
+        """Run fn() once admitted, retrying rate-limit and transient errors."""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return fn()
+            except Exception as e:
+                self.settle(tokens, 0)  # a rejected request used no tokens
+                time.sleep(self._on_error(e, attempt))
+                attempt += 1
+
+    async def acall(self, fn, tokens=0):
+        """Async version of call(); fn() returns an awaitable."""
+        attempt = 0
+        while True:
+            await self.aacquire(tokens)
+            try:
+                return await fn()
+            except asyncio.CancelledError:
+                self.settle(tokens, 0)  # e.g. a losing hedge: its completion never comes
+                raise
+            except Exception as e:
+                self.settle(tokens, 0)  # a rejected request used no tokens
+                await asyncio.sleep(self._on_error(e, attempt))
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+            }
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+__all__ = ['RunJournal', 'topic_key', 'GENERATED', 'IMAGE', 'PUBLISHED', 'DUPLICATE', 'FAILED']
+
+# Stages, in pipeline order. IMAGE is recorded once per role as "image:featured" / "image:content".
+GENERATED = "generated"
+IMAGE = "image"
+PUBLISHED = "published"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+def topic_key(row):
+    """Stable id of one input row: the same topic, type, keywords and image prompts resume the same work."""
+    fields = {key: row.get(key) or "" for key in sorted(row)}
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """Append-only SQLite journal of batch progress, one row per finished stage of a topic.
+
+    Every record is committed with synchronous=FULL before the next stage starts, so after a crash
+    the latest record of each stage is exactly the work already paid for. Generated images are
+    kept as content-addressed files next to the journal (a run can be resumed days later, after
+    the app's artifact store has been cleared).
+    """
+
+    def __init__(self, path, image_dir=None):
+        self.path = path
+        self.image_dir = image_dir or os.path.splitext(path)[0] + ".images"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(self.image_dir, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, topic_key TEXT NOT NULL, stage TEXT NOT NULL, "
+            "data TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_topic ON events (topic_key, seq)")
+        self._db.commit()
+
+    # --- Writing ---
+    def record(self, key, stage, **data):
+        """Append a finished stage (or FAILED with the stage and error) for a topic."""
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO events (topic_key, stage, data, created_at) VALUES (?, ?, ?, ?)",
+                (key, stage, payload, time.time()),
+            )
+            self._db.commit()
+
+    def save_image(self, image):
+        """Write an ImageAsset durably (fsync, then rename) and return its digest."""
+        image.save(self.image_dir)
+        return image.digest
+
+    # --- Reading ---
+    def _image_path(self, digest):
+        return os.path.join(self.image_dir, digest)
+
+    def load_image(self, digest):
+        """The ImageAsset saved under digest, or None when the file is gone."""
+        from image_asset import ImageAsset
+
+        try:
+            with open(self._image_path(digest), "rb") as f:
+                return ImageAsset(f.read())
+        except FileNotFoundError:
+            return None
+
+    def state(self, key):
+        """{stage: data} of one topic; later records of a stage replace earlier ones."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stage, data FROM events WHERE topic_key = ? ORDER BY seq", (key,)
+            ).fetchall()
+        return {stage: json.loads(data) for stage, data in rows}
+
+    def states(self):
+        """{topic_key: {stage: data}} for every topic in the journal, read in one pass."""
+        result = {}
+        with self._lock:
+            for key, stage, data in self._db.execute("SELECT topic_key, stage, data FROM events ORDER BY seq"):
+                result.setdefault(key, {})[stage] = json.loads(data)
+        return result
+
+    def stats(self):
+        with self._lock:
+            events, topics = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT topic_key) FROM events").fetchone()
+            stages = dict(self._db.execute(
+                "SELECT stage, COUNT(DISTINCT topic_key) FROM events GROUP BY stage"
+            ).fetchall())
+        return {"events": events, "topics": topics, "stages": stages}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
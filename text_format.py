@@ -0,0 +1,157 @@
+import re
+
+__all__ = [
+    'extract_title_and_body', 'clean_body_text', 'format_body_text', 'StreamingContentParser', 'SECTIONS',
+]
+
+SECTIONS = (
+    "Problem Statement:", "How sfHawk Helps:", "Benefits:", "Conclusion:",
+    "Introduction:", "Main Content:", "Key Points:", "Summary:"
+)
+
+# One scan puts every section header on its own line (collapsing the newlines before it) and
+# drops "**" markers; a second compiled pass bolds the headers. Output is identical to the old
+# per-section re.sub/str.replace chain.
+_SECTION_OR_BOLD_RE = re.compile(r"\n*(" + "|".join(map(re.escape, SECTIONS)) + r")|\*\*")
+_SECTION_RE = re.compile("|".join(map(re.escape, SECTIONS)))
+_BODY_PREFIX_RE = re.compile(r"\s*Body:")
+
+
+def _section_or_bold(match):
+    section = match.group(1)
+    return "\n" + section if section else ""
+
+
+def _format_sections(text):
+    text = _SECTION_OR_BOLD_RE.sub(_section_or_bold, text)
+    text = _SECTION_RE.sub(r"**\g<0>**", text)
+    return text.replace("\n\n\n", "\n\n")
+
+
+def _clean_lines(lines):
+    cleaned = [line for line in map(str.strip, lines) if line]
+    if cleaned and cleaned[0].startswith('Body:'):
+        first = cleaned[0][5:].lstrip()
+        if first:
+            cleaned[0] = first
+        else:
+            del cleaned[0]
+    return cleaned
+
+
+def _normalize_lines(lines):
+    return _format_sections('\n'.join(_clean_lines(lines))).strip()
+
+
+def extract_title_and_body(text):
+    lines = text.split('\n')
+    first = lines[0]
+    title = ""
+    body_start = None
+    if first.startswith('Title:'):
+        title, body_start = first[6:].strip(), 1
+    elif not first.startswith('Body:') and not first.startswith('Introduction:'):
+        title, body_start = first.strip(), 1
+    else:
+        for i in range(1, len(lines)):
+            if lines[i].startswith('Title:'):
+                title, body_start = lines[i][6:].strip(), i + 1
+                break
+    if title:
+        return title, _normalize_lines(lines[body_start:])
+
+    lowered = text.lower()
+    title_start = lowered.find("title:")
+    body_start = lowered.find("body:")
+    if title_start != -1 and body_start != -1 and body_start > title_start:
+        title = text[title_start + len("title:"):body_start].strip()
+        body = text[body_start + len("body:"):].strip()
+    else:
+        first_line = first.strip()
+        if first_line:
+            title = first_line
+            return title, _normalize_lines(lines[1:])
+        body = text.strip()
+    return title, _normalize_lines(body.split('\n'))
+
+
+def format_body_text(text):
+    return _format_sections(text).strip()
+
+
+def clean_body_text(text):
+    match = _BODY_PREFIX_RE.match(text)
+    if match:
+        text = text[match.end():]
+    return '\n'.join(line for line in map(str.strip, text.split('\n')) if line)
+
+
+class StreamingContentParser:
+    """Incremental extract_title_and_body: feed completion deltas, read title/body as they settle.
+
+    Lines are cleaned and formatted as soon as they are complete, so the preview matches the
+    final text line for line; finish() runs extract_title_and_body on the full text for the
+    authoritative result.
+    """
+
+    def __init__(self):
+        self.title = ""
+        self.body = ""
+        self._raw = []
+        self._pending = ""
+        self._line_count = 0
+        self._body_started = False
+
+    @property
+    def text(self):
+        """The raw completion text fed so far."""
+        return "".join(self._raw)
+
+    def feed(self, delta):
+        """Consume a text delta and return the newly formatted body lines (possibly empty)."""
+        self._raw.append(delta)
+        self._pending += delta
+        new_lines = []
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            formatted = self._consume_line(line)
+            if formatted:
+                new_lines.append(formatted)
+            elif not self.body and not self._body_started:
+                new_lines.clear()  # a late "Title:" line discarded the body so far
+        if new_lines:
+            chunk = "\n".join(new_lines)
+            self.body = f"{self.body}\n{chunk}" if self.body else chunk.lstrip()
+        return new_lines
+
+    def _consume_line(self, line):
+        self._line_count += 1
+        if self._line_count == 1:
+            if line.startswith('Title:'):
+                self.title = line[6:].strip()
+                return None
+            if not line.startswith('Body:') and not line.startswith('Introduction:'):
+                self.title = line.strip()
+                return None
+        elif not self.title and line.startswith('Title:'):
+            # A late title line: extract_title_and_body drops everything above it.
+            self.title = line[6:].strip()
+            self.body = ""
+            self._body_started = False
+            return None
+        line = line.strip()
+        if not line:
+            return None
+        if not self._body_started:
+            self._body_started = True
+            if line.startswith('Body:'):
+                line = line[5:].lstrip()
+                if not line:
+                    self._body_started = False
+                    return None
+        return _format_sections("\n" + line)[1:]
+
+    def finish(self):
+        """Return the final (title, body) for everything fed so far."""
+        self.title, self.body = extract_title_and_body(self.text)
+        return self.title, self.body
@@ -0,0 +1,288 @@
+"""Lightweight stage timing for the generation-to-publish path.
+
+    with tracing.span("media_upload", role="featured") as s:
+        ...
+        s.set(bytes=len(data))
+
+Spans nest through contextvars (async tasks and asyncio.to_thread inherit them; use bind() for
+thread pools), are kept in memory per trace, appended to a JSON lines file and aggregated into
+Prometheus histograms. Summarise an existing log with:
+
+    python tracing.py .cache/traces.jsonl            # per-stage table
+    python tracing.py .cache/traces.jsonl --prometheus
+"""
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+__all__ = ['Span', 'Tracer', 'get_tracer', 'span', 'trace', 'record', 'bind', 'current_trace_id']
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Numeric span attributes summed into Prometheus counters.
+TOKEN_ATTRIBUTES = ("prompt_tokens", "completion_tokens")
+BYTE_ATTRIBUTE = "bytes"
+
+_current = contextvars.ContextVar("tracing_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attrs", "error", "_t0")
+
+    def __init__(self, name, trace_id, parent_id=None, **attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration = None
+        self.attrs = attrs
+        self.error = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": round(self.start, 6),
+            "duration_s": None if self.duration is None else round(self.duration, 6),
+            "error": self.error, "attrs": self.attrs,
+        }
+
+
+class _Span:
+    """Context manager behind span()/trace(); usable with both `with` and `async with`."""
+
+    def __init__(self, tracer, name, attrs, new_trace):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.new_trace = new_trace
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None or self.new_trace:
+            self.span = Span(self.name, uuid.uuid4().hex, None, **self.attrs)
+        else:
+            self.span = Span(self.name, parent.trace_id, parent.span_id, **self.attrs)
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self.span)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class Tracer:
+    """Collects finished spans: recent traces in memory, a JSONL sink and per-stage aggregates."""
+
+    def __init__(self, path=None, max_traces=200, buckets=DEFAULT_BUCKETS):
+        self.path = path
+        self.max_traces = max_traces
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._traces = OrderedDict()
+        self._stages = {}
+
+    def span(self, name, **attrs):
+        return _Span(self, name, attrs, new_trace=False)
+
+    def trace(self, name, **attrs):
+        """A root span: everything opened inside it belongs to one run."""
+        return _Span(self, name, attrs, new_trace=True)
+
+    def record(self, name, seconds, **attrs):
+        """Add an already measured duration (e.g. time to first token) under the current span."""
+        parent = _current.get()
+        span = Span(name, parent.trace_id if parent else uuid.uuid4().hex, parent.span_id if parent else None, **attrs)
+        span.start -= seconds
+        span.duration = seconds
+        self.finish(span, measured=True)
+
+    def finish(self, span, measured=False):
+        if not measured:
+            span.duration = time.perf_counter() - span._t0
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            spans = self._traces.setdefault(span.trace_id, [])
+            spans.append(span)
+            self._traces.move_to_end(span.trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            self._aggregate(span.name, span.duration, span.error, span.attrs)
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def _aggregate(self, name, duration, error, attrs):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {
+                "count": 0, "sum": 0.0, "errors": 0, "buckets": [0] * len(self.buckets),
+                "bytes": 0, "tokens": {key: 0 for key in TOKEN_ATTRIBUTES}, "samples": deque(maxlen=1000),
+            }
+        stage["count"] += 1
+        stage["sum"] += duration
+        stage["samples"].append(duration)
+        if error:
+            stage["errors"] += 1
+        for i, bound in enumerate(self.buckets):
+            if duration <= bound:
+                stage["buckets"][i] += 1
+        if isinstance(attrs.get(BYTE_ATTRIBUTE), (int, float)):
+            stage["bytes"] += attrs[BYTE_ATTRIBUTE]
+        for key in TOKEN_ATTRIBUTES:
+            if isinstance(attrs.get(key), (int, float)):
+                stage["tokens"][key] += attrs[key]
+
+    def reset(self):
+        """Forget recent traces and aggregates (e.g. between benchmark scenarios); the log is kept."""
+        with self._lock:
+            self._traces.clear()
+            self._stages.clear()
+
+    # --- Reading ---
+    def spans(self, trace_id):
+        with self._lock:
+            return list(self._traces.get(trace_id, ()))
+
+    def breakdown(self, trace_id):
+        """Rows for one run in start order: stage (indented by depth), ms, and attributes."""
+        spans = sorted(self.spans(trace_id), key=lambda s: s.start)
+        depth = {}
+        rows = []
+        for s in spans:
+            depth[s.span_id] = depth.get(s.parent_id, -1) + 1
+            details = ", ".join(f"{k}={v}" for k, v in s.attrs.items())
+            rows.append({
+                "stage": "  " * depth[s.span_id] + s.name,
+                "ms": round(s.duration * 1000, 1),
+                "details": details + (f" error={s.error}" if s.error else ""),
+            })
+        return rows
+
+    def summary(self):
+        """Per-stage count, mean and p50/p95/p99 seconds over recent samples."""
+        with self._lock:
+            stages = {name: dict(stage, samples=sorted(stage["samples"])) for name, stage in self._stages.items()}
+        result = {}
+        for name, stage in sorted(stages.items()):
+            samples = stage["samples"]
+            pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+            result[name] = {
+                "count": stage["count"], "errors": stage["errors"], "mean_s": stage["sum"] / stage["count"],
+                "p50_s": pick(0.50), "p95_s": pick(0.95), "p99_s": pick(0.99),
+                "bytes": stage["bytes"], **stage["tokens"],
+            }
+        return result
+
+    def prometheus_text(self, prefix="content_pipeline"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for name, stage in stages:
+                for bound, count in zip(self.buckets, stage["buckets"]):
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+            lines += [f"# HELP {prefix}_stage_errors_total Stages that raised.", f"# TYPE {prefix}_stage_errors_total counter"]
+            lines += [f'{prefix}_stage_errors_total{{stage="{name}"}} {stage["errors"]}' for name, stage in stages]
+            lines += [f"# HELP {prefix}_bytes_total Bytes produced or sent per stage.", f"# TYPE {prefix}_bytes_total counter"]
+            lines += [f'{prefix}_bytes_total{{stage="{name}"}} {stage["bytes"]}' for name, stage in stages if stage["bytes"]]
+            lines += [f"# HELP {prefix}_tokens_total LLM tokens per stage.", f"# TYPE {prefix}_tokens_total counter"]
+            for name, stage in stages:
+                for kind, count in stage["tokens"].items():
+                    if count:
+                        lines.append(f'{prefix}_tokens_total{{stage="{name}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_jsonl(cls, path):
+        """Rebuild aggregates (not the in-memory traces) from a JSON lines log."""
+        tracer = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    tracer._aggregate(item["name"], item["duration_s"] or 0.0, item["error"], item["attrs"])
+        return tracer
+
+
+# --- Module-level API (one process-wide tracer) ---
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, **attrs):
+    return _tracer.span(name, **attrs)
+
+
+def trace(name, **attrs):
+    return _tracer.trace(name, **attrs)
+
+
+def record(name, seconds, **attrs):
+    _tracer.record(name, seconds, **attrs)
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace_id if current else None
+
+
+def bind(fn):
+    """Run fn in a copy of the caller's context, so spans opened in a worker thread nest correctly.
+
+    Bind once per submitted task: a copied context cannot be entered by two threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a span log written by tracing.py.")
+    parser.add_argument("path", help="JSON lines span log (TRACE_LOG_PATH)")
+    parser.add_argument("--prometheus", action="store_true", help="print Prometheus text instead of a table")
+    args = parser.parse_args(argv)
+
+    tracer = Tracer.from_jsonl(args.path)
+    if args.prometheus:
+        sys.stdout.write(tracer.prometheus_text())
+        return 0
+    print(f"{'stage':<22}{'count':>7}{'errors':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'bytes':>12}{'tokens':>9}")
+    for name, s in tracer.summary().items():
+        tokens = sum(s[key] for key in TOKEN_ATTRIBUTES)
+        print(f"{name:<22}{s['count']:>7}{s['errors']:>8}{s['mean_s']:>8.3f}s{s['p50_s']:>8.3f}s"
+              f"{s['p95_s']:>8.3f}s{s['p99_s']:>8.3f}s{s['bytes']:>12}{tokens:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+__all__ = ['WordPressClient', 'media_headers', 'find_post_params', 'matching_post', 'MEDIA_FIELDS', 'POST_FIELDS']
+
+# Only ask WordPress for the fields we actually read back.
+MEDIA_FIELDS = "id,source_url"
+POST_FIELDS = "id,link,meta"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A POST is only replayed when the server refused it before doing any work.
+POST_RETRY_STATUSES = (429, 503)
+
+
+class _WordPressRetry(Retry):
+    """Retry idempotent requests on 429/5xx; retry POSTs only on 429/503 so uploads are never duplicated."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == "POST":
+            return bool(self.total) and status_code in POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def media_headers(filename, content_type="image/png"):
+    return {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Content-Type': content_type,
+    }
+
+
+def find_post_params(search):
+    """Query for find_post's candidates: a title search over any status, newest first."""
+    return {"search": search, "status": "any", "per_page": 20, "orderby": "date", "order": "desc", "_fields": "id,link,meta"}
+
+
+def matching_post(items, meta_key, meta_value):
+    for item in items:
+        if (item.get("meta") or {}).get(meta_key) == meta_value:
+            return item["id"], item.get("link"), item["meta"]
+    return None
+
+
+class WordPressClient:
+    """Long-lived WordPress REST client with a pooled keep-alive session and retry/backoff."""
+
+    def __init__(self, base_url, username=None, password=None, verify=False, timeout=60,
+                 pool_size=16, retries=3, backoff_factor=0.5):
+        self.base_url = base_url.rstrip("/")
+        self.api_url = f"{self.base_url}/wp-json/wp/v2"
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        if username and password:
+            self.session.auth = HTTPBasicAuth(username, password)
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        retry = _WordPressRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, route):
+        return f"{self.api_url}/{route.lstrip('/')}"
+
+    def request(self, method, route, fields=None, **kwargs):
+        """Send a request to a /wp/v2 route, trimming the response to `fields` when given."""
+        if fields:
+            kwargs["params"] = {**(kwargs.get("params") or {}), "_fields": fields}
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.url(route), **kwargs)
+
+    def get(self, route, **kwargs):
+        return self.request("GET", route, **kwargs)
+
+    def post(self, route, **kwargs):
+        return self.request("POST", route, **kwargs)
+
+    def iter_pages(self, route, params=None, fields=None, per_page=100, workers=8):
+        """Yield each page of a collection route in order.
+
+        The first response's X-WP-TotalPages tells how many pages remain; those are fetched
+        concurrently over the pooled session.
+        """
+        params = {**(params or {}), "per_page": per_page}
+
+        def fetch(page):
+            resp = self.get(route, params={**params, "page": page}, fields=fields)
+            resp.raise_for_status()
+            return resp
+
+        first = fetch(1)
+        yield first.json()
+        total_pages = int(first.headers.get("X-WP-TotalPages", 1))
+        if total_pages <= 1:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, total_pages - 1))) as pool:
+            for resp in pool.map(fetch, range(2, total_pages + 1)):
+                yield resp.json()
+
+    def iter_items(self, route, params=None, fields=None, per_page=100, workers=8):
+        """Yield every item of a collection route (pages, posts, use-case, ...)."""
+        for page in self.iter_pages(route, params, fields, per_page, workers):
+            yield from page
+
+    def upload_media(self, data, filename, content_type="image/png"):
+        """Upload binary media and return (media_id, source_url)."""
+        resp = self.post("media", data=data, headers=media_headers(filename, content_type), fields=MEDIA_FIELDS)
+        resp.raise_for_status()
+        resp_json = resp.json()
+        return resp_json['id'], resp_json['source_url']
+
+    def create_post(self, route, data):
+        """Create an item on a post-type route (e.g. "posts", "use-case") and return (id, link, meta).
+
+        meta holds only the keys WordPress saved, i.e. those registered with show_in_rest.
+        """
+        response = self.post(route, json=data, fields=POST_FIELDS)
+        if response.status_code in (201, 200):
+            resp_json = response.json()
+            return resp_json.get("id"), resp_json.get("link"), resp_json.get("meta") or {}
+        # HTTPError keeps the response, so callers can tell a retryable status from a rejected post.
+        raise requests.HTTPError(f"Failed to upload post: {response.status_code} {response.text}", response=response)
+
+    def find_post(self, route, search, meta_key, meta_value):
+        """(id, link, meta) of an item on a post-type route whose meta_key equals meta_value, or None.
+
+        The REST API cannot filter on meta, so candidates come from a title search (any status)
+        and are matched client-side; meta_key must be registered with show_in_rest.
+        """
+        response = self.get(route, params=find_post_params(search))
+        response.raise_for_status()
+        return matching_post(response.json(), meta_key, meta_value)
+
+    def post_exists(self, route, post_id):
+        """Whether an item is still on the site; a deleted (404/410) or trashed one is gone."""
+        response = self.get(f"{route}/{post_id}", fields="id,status")
+        if response.status_code in (404, 410):
+            return False
+        response.raise_for_status()
+        return response.json().get("status") != "trash"
+
+    def delete_media(self, media_id):
+        """Permanently delete a media item; a 404/410 counts as already deleted."""
+        response = self.request("DELETE", f"media/{media_id}", params={"force": "true"})
+        if response.status_code not in (200, 404, 410):
+            response.raise_for_status()
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import html
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+__all__ = ['WordPressMirror', 'MIRROR_ROUTES', 'normalize_title', 'html_to_text']
+
+# Post types mirrored by default, as REST routes.
+MIRROR_ROUTES = ("posts", "use-case", "pages")
+MIRROR_FIELDS = "id,slug,title,status,link,modified,modified_gmt,content"
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_title(title):
+    """Case-, punctuation- and entity-insensitive form of a title, used for indexed lookups."""
+    return _NON_WORD_RE.sub(" ", html.unescape(title or "").lower()).strip()
+
+
+def html_to_text(markup):
+    """Plain text of rendered post content, whitespace collapsed."""
+    return _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", markup or ""))).strip()
+
+
+class WordPressMirror:
+    """Local SQLite copy of published WordPress items (id, slug, title, modified time, content hash).
+
+    The first sync of a route pulls everything; later syncs only ask for items with
+    modified_after the newest modification time already stored.
+    """
+
+    def __init__(self, path, wp_client=None, status="publish"):
+        self.path = path
+        self.wp_client = wp_client
+        self.status = status
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "route TEXT NOT NULL, id INTEGER NOT NULL, slug TEXT NOT NULL, title TEXT NOT NULL, "
+            "title_key TEXT NOT NULL, status TEXT NOT NULL, link TEXT NOT NULL, "
+            "modified TEXT NOT NULL, modified_gmt TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "synced_at REAL NOT NULL, body_text TEXT NOT NULL DEFAULT '', PRIMARY KEY (route, id))"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(items)")}
+        if "body_text" not in columns:
+            # Mirrors created before bodies were stored: add the column and force a full re-pull.
+            self._db.execute("ALTER TABLE items ADD COLUMN body_text TEXT NOT NULL DEFAULT ''")
+            self._db.execute("DROP TABLE IF EXISTS sync_state")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_slug ON items (slug)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_title_key ON items (title_key)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_route_modified ON items (route, modified)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            "route TEXT PRIMARY KEY, cursor TEXT, full_synced_at REAL, synced_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    # --- Sync ---
+    def _client(self):
+        if self.wp_client is None:
+            import main
+            self.wp_client = main.get_wordpress_client()
+        return self.wp_client
+
+    def _row(self, route, item, now):
+        content = (item.get("content") or {}).get("rendered", "")
+        title = html.unescape(item["title"]["rendered"])
+        return (
+            route, item["id"], item["slug"], title, normalize_title(title), item["status"], item["link"],
+            item["modified"], item["modified_gmt"], hashlib.sha256(content.encode("utf-8")).hexdigest(), now,
+            html_to_text(content),
+        )
+
+    def sync(self, route, full=False, workers=8):
+        """Pull new and changed items for one route; returns {"route", "fetched", "removed", "full"}."""
+        with self._lock:
+            state = self._db.execute("SELECT cursor FROM sync_state WHERE route = ?", (route,)).fetchone()
+        cursor = state[0] if state else None
+        full = full or state is None
+        params = {"status": self.status, "orderby": "modified", "order": "asc"}
+        if not full and cursor:
+            # modified_after is exclusive and second-granular; re-reading one second is harmless.
+            since = datetime.fromisoformat(cursor) - timedelta(seconds=1)
+            params["modified_after"] = since.isoformat()
+
+        now = time.time()
+        fetched, removed, newest = 0, 0, cursor
+        seen = set()
+        for page in self._client().iter_pages(route, params=params, fields=MIRROR_FIELDS, workers=workers):
+            rows = [self._row(route, item, now) for item in page]
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO items (route, id, slug, title, title_key, status, link, "
+                    "modified, modified_gmt, content_hash, synced_at, body_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+            fetched += len(rows)
+            seen.update(row[1] for row in rows)
+            for row in rows:
+                if newest is None or row[7] > newest:
+                    newest = row[7]
+
+        with self._lock:
+            if full:
+                # Only a full pull can tell which items were deleted or unpublished.
+                stale = [
+                    item_id for (item_id,) in self._db.execute("SELECT id FROM items WHERE route = ?", (route,))
+                    if item_id not in seen
+                ]
+                self._db.executemany("DELETE FROM items WHERE route = ? AND id = ?", [(route, i) for i in stale])
+                removed = len(stale)
+            self._db.execute(
+                "INSERT INTO sync_state (route, cursor, full_synced_at, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(route) DO UPDATE SET cursor = excluded.cursor, synced_at = excluded.synced_at, "
+                "full_synced_at = COALESCE(excluded.full_synced_at, sync_state.full_synced_at)",
+                (route, newest, now if full else None, now),
+            )
+            self._db.commit()
+        return {"route": route, "fetched": fetched, "removed": removed, "full": full}
+
+    def sync_all(self, routes=MIRROR_ROUTES, full=False, workers=8):
+        return [self.sync(route, full=full, workers=workers) for route in routes]
+
+    # --- Queries ---
+    _COLUMNS = "route, id, slug, title, status, link, modified, content_hash"
+
+    def _select(self, where, args, limit=None):
+        sql = f"SELECT {self._COLUMNS} FROM items WHERE {where} ORDER BY modified DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            cursor = self._db.execute(sql, args)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def get(self, route, item_id):
+        rows = self._select("route = ? AND id = ?", (route, item_id))
+        return rows[0] if rows else None
+
+    def find_by_slug(self, slug, route=None):
+        if route:
+            return self._select("slug = ? AND route = ?", (slug, route))
+        return self._select("slug = ?", (slug,))
+
+    def find_by_title(self, title, route=None):
+        """Items whose title matches ignoring case, punctuation and HTML entities."""
+        key = normalize_title(title)
+        if route:
+            return self._select("title_key = ? AND route = ?", (key, route))
+        return self._select("title_key = ?", (key,))
+
+    def search_titles(self, text, route=None, limit=20):
+        """Items whose normalized title starts with text (uses the title_key index)."""
+        key = normalize_title(text)
+        if not key:
+            return []
+        # Range scan instead of LIKE so the index is used: every key with this prefix sorts in [key, key + max char).
+        where, args = "title_key >= ? AND title_key < ?", [key, key + "\U0010ffff"]
+        if route:
+            where += " AND route = ?"
+            args.append(route)
+        return self._select(where, args, limit)
+
+    def find_by_content_hash(self, content_hash):
+        return self._select("content_hash = ?", (content_hash,))
+
+    def iter_bodies(self, routes=None):
+        """Yield (route, id, title, content_hash, body_text) for every mirrored item."""
+        sql = "SELECT route, id, title, content_hash, body_text FROM items"
+        args = ()
+        if routes:
+            sql += f" WHERE route IN ({', '.join('?' * len(routes))})"
+            args = tuple(routes)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        yield from rows
+
+    def last_synced(self):
+        """Time of the latest sync of any route, or None if the mirror was never synced."""
+        with self._lock:
+            return self._db.execute("SELECT MAX(synced_at) FROM sync_state").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._db.execute("SELECT route, COUNT(*) FROM items GROUP BY route").fetchall())
+            synced = dict(self._db.execute("SELECT route, synced_at FROM sync_state").fetchall())
+        return {"items": counts, "synced_at": synced}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Sync or query the local mirror of WordPress content.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="pull new and changed items")
+    sync_parser.add_argument("routes", nargs="*", default=list(MIRROR_ROUTES))
+    sync_parser.add_argument("--full", action="store_true", help="pull everything and drop deleted items")
+    sync_parser.add_argument("-w", "--workers", type=int, default=8, help="concurrent page requests")
+    find_parser = subparsers.add_parser("find", help="look up existing items by title prefix or slug")
+    find_parser.add_argument("text")
+    find_parser.add_argument("--route")
+    args = parser.parse_args(argv)
+
+    import main
+    mirror = main.get_wp_mirror()
+    if args.command == "sync":
+        for result in mirror.sync_all(args.routes, full=args.full, workers=args.workers):
+            kind = "full" if result["full"] else "incremental"
+            print(f"{result['route']}: {kind}, {result['fetched']} fetched, {result['removed']} removed")
+        return 0
+    rows = mirror.find_by_slug(args.text, args.route) or mirror.search_titles(args.text, args.route)
+    for row in rows:
+        print(f"{row['route']}/{row['id']}  {row['modified']}  {row['title']}  {row['link']}")
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())